@@ -14,6 +14,8 @@
 #	vehicle - define and manage vehicle and hill sprites
 #	tools - (optional) logging, debug, write, help
 #	button - provides menu button objects
+#	render - pushes only the changed parts of the screen to the display,
+#		paces sim steps apart from drawn frames
 #	neuronNetCmplx - AI of neurons, complex math to control vehicle
 #	This is based on Neuron.py that only uses real math.
 #
@@ -26,16 +28,15 @@
 import pygame
 from pygame.locals import *
    
+import sys
 import time
 import json
 
 # local simulator imports
 import desertmap
+import render
 import tools
 
-# how fast the simulation runs
-fps = 5    
-
 pygame.init()
 if not pygame.font.get_init() :
 	pygame.font.init()
@@ -63,7 +64,9 @@ for event in allowed_events:
 	pygame.event.set_allowed(event)
 
 # now get and process user events, take a step
-fps_clock = pygame.time.Clock()
+# how fast the simulation runs and how often it is drawn
+frame_clock = render.FrameClock(config)
+sim_map.menu_turbo(frame_clock.turbo)
 
 # User Interaction
 # menu buttons:
@@ -78,6 +81,8 @@ fps_clock = pygame.time.Clock()
 #	4 - Run - Change button to Stop
 #			Manual mode - run at previous speed, arrow keys change dir and step size
 #			AI mode - run at previous speed, arrow keys change loop speed
+#	5 - Turbo/Normal - uncapped steps, draw every few frames / back to normal
+#	keys: + or = doubles the step rate, - halves it, t toggles turbo
 #	
 running = False
 while True:
@@ -98,8 +103,9 @@ while True:
 		elif event.type == pygame.MOUSEBUTTONDOWN:
 			# it is a menu button, get button name 
 			menu_return = sim_map.menu.check_menu(event)
-			if menu_return != 'scene' :
+			if menu_return == 'scene' :
 				sim_map.mouse_button(event)
+			else :
 				print(menu_return)
 			
 			if menu_return == 'Run':
@@ -124,7 +130,7 @@ while True:
 			elif menu_return == 'Step':
 				# if running then stop, then take a step
 				if running :
-					running == False
+					running = False
 					sim_map.menu_stop()
 				sim_map.menu_step()
     
@@ -132,6 +138,10 @@ while True:
 				running = False
 				sim_map.menu_stop()
 
+			elif menu_return in ('Turbo', 'Normal'):
+				frame_clock.set_turbo(menu_return == 'Turbo')
+				sim_map.menu_turbo(frame_clock.turbo)
+
 			elif menu_return == 'Help':
 				running = False
 				sim_map.menu_help()
@@ -144,19 +154,39 @@ while True:
 				pygame.quit()
 				exit(0)
                 
-		# no click on button, so check the direction keys
+		# no click on button, so check the rate keys and direction keys
 		elif event.type == KEYDOWN :
-			sim_map.direction_key(event)
+			key = pygame.key.name(event.key)
+			if key in ('+', '=') :
+				frame_clock.faster()
+			elif key == '-' :
+				frame_clock.slower()
+			elif key == 't' :
+				frame_clock.set_turbo(not frame_clock.turbo)
+				sim_map.menu_turbo(frame_clock.turbo)
+			else :
+				sim_map.direction_key(event)
 
 	# no valid user action, 
-	# move the vehicle under AI or manual control
-	if running :
-		sim_map.menu_step()
-
-	pygame.display.update()
+	# move the vehicle under AI or manual control, as many steps as
+	# the frame clock allows. The steps do not draw the vehicle.
+	sim_map.vehicle.drawing = False
+	for step in range(frame_clock.steps(running)) :
+		if not sim_map.menu_step() :
+			# AI is at the optimal result
+			running = False
+			sim_map.menu_stop()
+			break
+	sim_map.vehicle.drawing = True
+
+	# draw the vehicle once and push only what was drawn to the
+	# display, in turbo not every frame
+	if frame_clock.render() :
+		sim_map.vehicle.show()
+		sim_map.dirty.update()
 	
-	# slow everything down depending on size of fps
-	fps_clock.tick(fps)
+	# wait for the next frame, no wait in turbo while steps are taken
+	frame_clock.tick()
 	# loop de loop
 
 
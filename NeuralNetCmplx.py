@@ -6,7 +6,9 @@
 #	(#layers, #neurons/layer) is defined in a JSON configuration file.
 #	Extension: applied to controlling vehicle movement
 #	Extension: all math is complex 
-#	Extension: prints state after each step if TEST is True in config
+#	Extension: traces state after each step to the 'nn' trace channel,
+#		see module tracer
+#	Extension: each layer is a complex weight matrix, math is done by numpy
 #
 #	Comment references:
 #	[1] Wikipedia article on Backpropagation
@@ -19,8 +21,19 @@
 import random
 import math
 import cmath
+import sys
+import json
+import struct
+import time
+import numpy as np
+import tracer
+import optimizers
 
 TEST = False
+_trace = tracer.channel('nn')
+
+# first bytes of a weights file written by NeuralNetCmplx.save
+WEIGHTS_MAGIC = b'AILABWT1'
 
 # CLASS: NeuralNetCmplx class of module NeuralNetCmplx
 # Desc: AI for complex input vectors, returns a complex adjustment
@@ -43,32 +56,62 @@ class NeuralNetCmplx:
 		self.targets = 1		# where target = s/(s+n) with n == 0
 		
 		#  Number of layers is input + possible hidden + output (min is 2, input and output)
-		self.layers = self.structure['layers']
-		self.num_layers = self.layers['count']
+		#  plus the virtual error layer. Either the layers are listed neuron by 
+		#  neuron or "sizes" lists the neuron count of each layer, see expand_sizes.
+		if 'sizes' in self.structure :
+			self.num_layers = len(self.structure['sizes']) + 1
+		else :
+			self.num_layers = self.structure['layers']['count']
 		if self.num_layers < 2 : 
 			print ('Error: number of layers is less than 2')
 			error_exit()
 		self.num_outputs = self.num_test_sets				# number of input/output signals
 		self.learning_rate = config['learning rate'] 	# somewhere around 0.001
+		# weight update rule and learning rate schedule, see module optimizers
+		self.optimizer = optimizers.make_optimizer(config)
 		self.cycle_limit = config['cycle limit']     	# maximum number of steps
 		# return once error is smaller than this value
 		self.errlim_mag = config['error limit mag']
 		self.errlim_ang = config['error limit ang']
+		# adapt loop: wall clock budget per call, None for no budget, and 
+		# stop once the best error improved by less than "min improvement"
+		# (relative) over the last "plateau cycles" cycles
+		self.budget_ms = config.get('adapt budget ms')
+		self.plateau_cycles = config.get('plateau cycles', 50)
+		self.min_improvement = config.get('min improvement', 0.001)
+		self.stop_reason = None		# why the last adapt loop stopped
+		self.error_mag = math.inf	# worst set error magnitude of the last step
 		self.target_output = (0+0j)
 		self.error_return = (0+0j)
+		# error of each output neuron for each input set of the last step
+		self.output_errors = np.zeros((1, self.num_outputs), dtype=np.complex128)
 		
-		# create a list of layer dictionaries
-		self.layers = list()
-		for id in range(self.num_layers) :
-			layer_dict = self.structure['layers'][str(id)]
-			if id < self.num_layers :
-				next_layer_dict = self.structure['layers'][str(++id)]
-			else :
-				next_layer_dict = None
-			layer = Layer(id, layer_dict, next_layer_dict, self.learning_rate)
-			if layer == 'error' :
-				error_exit()
-			self.layers.append(layer)
+		# create a list of layers, each compiled once from its dictionary
+		if 'sizes' in self.structure :
+			self.layers = expand_sizes(self.structure, self.optimizer)
+		else :
+			self.layers = list()
+			for id in range(self.num_layers) :
+				layer_dict = self.structure['layers'][str(id)]
+				if id + 1 < self.num_layers :
+					next_layer_dict = self.structure['layers'][str(id + 1)]
+				else :
+					next_layer_dict = None
+				layer = compile_layer(id, layer_dict, next_layer_dict, self.optimizer)
+				self.layers.append(layer)
+		# the virtual error layer only holds the output error, it has no weights to wire
+		for id in range(1, self.num_layers - 1) :
+			self.layers[id].connect(self.layers[id - 1])
+		
+		# "complex" keeps complex128 arrays, "split" holds real and imaginary
+		# parts in separate float arrays of "dtype", see SplitLayer
+		self.backend = config.get('backend', 'complex')
+		self.dtype = config.get('dtype', 'float32')
+		if self.backend == 'split' :
+			self.layers = [SplitLayer(layer, self.dtype) for layer in self.layers]
+		elif self.backend != 'complex' :
+			print('Error: unknown backend {}'.format(self.backend))
+			error_exit()
 		self.sensor_inputs = list()
 
     # DEF: adapt def of class NeuralNetCmplx
@@ -78,40 +121,71 @@ class NeuralNetCmplx:
 	# 		Loop steps until minimum error or max cycle count
 	# 		The goal is to avoid the hills and make S / (Sc + N) == 1
 	# Parm: sensor_inputs - array of sensor inputs, target plus hill noise.
+	#		Either one list of inputs or an (N x inputs) array of N input sets.
 	# Parm: target_input - pure target signal, S, and no hill noise, N. 
+	#		One value, or one per input set for a batch.
+	# Parm: step - True for a single step, else loop until the error is
+	#		under the limits, the error stops improving, the time budget 
+	#		is used or the cycle limit is reached.
+	# Parm: budget_ms - wall clock budget of the loop in milliseconds, 
+	#		default is "adapt budget ms" of the config
 	# Return: vehicle_command, a complex value of direction and speed.	
+	#		The loop returns the command of the cycle with the smallest
+	#		error, or -1 if the error got under the limits.
+	#		self.stop_reason tells why the loop stopped.
 	# Usage: desert_map
-	def adapt(self, sensor_inputs, target_input, step):
+	def adapt(self, sensor_inputs, target_input, step, budget_ms=None):
 		self.sensor_inputs = sensor_inputs
 		# apply the sensor data to the input layer
 		# this data never changes until the next adaptation
-		print('Adapt to sensor inputs:')
-		for i in range(len(sensor_inputs)):
-			sens_mag, sens_ang = cmplxToRect(sensor_inputs[i])
-			print( '{} : mag = {} angle = {} deg'.format(i, sens_mag, sens_ang))
-		targ_mag, targ_ang = cmplxToRect(target_input)
-		print( 'Target: mag = {} angle = {} deg'.format(targ_mag, targ_ang))
+		if _trace.info: 
+			_trace.emit('adapt', sensor_inputs=np.array(sensor_inputs), target=np.array(target_input))
 		
 		# support user input of single step
 		if( step == True ) :
 			return self.step( sensor_inputs, target_input )
 			
-		self.errlim_mag = self.errlim_mag + 10
-		self.errlim_ang = self.errlim_ang + 180
+		if budget_ms == None :
+			budget_ms = self.budget_ms
+		if budget_ms == None :
+			deadline = math.inf
+		else :
+			deadline = time.perf_counter() + budget_ms / 1000
 		cycle_count = 0
-		self.error_return = complex(self.errlim_mag + 10, self.errlim_ang + 180)
-		e_mag,e_ang = cmplxToRect(self.error_return)
-		print( 'e_mag:{}, e_ang:{}, cycle_count:{}'.format(e_mag, e_ang, cycle_count))
-		print( 'maglim:{}, anglim:{}'.format(self.errlim_mag, self.errlim_ang))
+		best_error = math.inf
+		best_command = 0j
+		plateau_error = math.inf	# best error at the start of the plateau window
+		plateau_start = 0
+		self.stop_reason = 'cycle limit'
 
 		# else cycle....
-		while((e_mag > self.errlim_mag \
-			or e_ang > self.errlim_ang) \
-			and cycle_count < self.cycle_limit) :
+		while cycle_count < self.cycle_limit :
 			vehicle_command = self.step( sensor_inputs, target_input )
 			cycle_count += 1
-			print( 'e_mag:{}, e_ang:{}, cycle_count:{}'.format(e_mag, e_ang, cycle_count))
-		return vehicle_command
+			if _trace.debug: 
+				_trace.emit('cycle', e_mag=self.error_mag, cycle_count=cycle_count)
+			if isinstance(vehicle_command, int) and vehicle_command == -1 :
+				self.stop_reason = 'converged'
+				best_command = vehicle_command
+				break
+			# the command goes with the error of the same forward pass
+			if self.error_mag < best_error :
+				best_error = self.error_mag
+				best_command = vehicle_command
+			# plateau: not enough relative improvement for a while
+			if best_error < plateau_error * (1 - self.min_improvement) :
+				plateau_error = best_error
+				plateau_start = cycle_count
+			elif cycle_count - plateau_start >= self.plateau_cycles :
+				self.stop_reason = 'plateau'
+				break
+			if time.perf_counter() > deadline :
+				self.stop_reason = 'budget'
+				break
+		if _trace.info: 
+			_trace.emit('adapted', stop_reason=self.stop_reason, cycles=cycle_count, 
+				best_error=best_error)
+		return best_command
 			
     # DEF: step def of class NeuralNetCmplx
 	# Desc: one step in adaptation to new input data.
@@ -122,9 +196,14 @@ class NeuralNetCmplx:
 	#			is the number of training sets
 	# Parm: inputs - list: state of the environment (input signals)
 	#		There is a set of inputs for each target output.
+	#		A 2-D (N x inputs) array runs N input sets in one pass, 
+	#		one row per set. A plain list is a batch of one.
 	#		note: sensor_inputs must be normaized by magnitude
 	# Parm: target_output - value of the target signal, no noise, normalized
-	# Return: vehicle command, complex, of direction and speed 
+	#		a single value, one value per input set, or (N x outputs)
+	# Return: vehicle command, complex, of direction and speed. It is the 
+	#		first output neuron, one command per input set for a batch.
+	#		-1 once every input set is below the error limit
 	# Usage: public for one step and adapt if loop till below error limit
 	def step(self, inputs, target_output ):
 		
@@ -141,7 +220,11 @@ class NeuralNetCmplx:
 		
 		# feed forward: propagate inputs through all layers
 		# this applies the inputs to the  first layer outputs
-		previous_outputs = inputs
+		# each row of the batch is one input set
+		previous_outputs = np.atleast_2d(np.asarray(inputs, dtype=np.complex128))
+		if self.backend == 'split' :
+			previous_outputs = (previous_outputs.real.astype(self.dtype), 
+				previous_outputs.imag.astype(self.dtype))
 		for layer in self.layers : 
 			previous_outputs = layer.feed_forward(previous_outputs)
  
@@ -149,251 +232,568 @@ class NeuralNetCmplx:
 		# the final output is available. So:
 		# backward propagation: feed the error back through the layers
 		# to adjust the weights
-		output_error = self.calculate_total_error(target_output)	
-		mag, angle = cmath.polar(output_error)
-		if TEST:
-			rmag = round(mag)
-			angle = round(angle)
-			print('After feedforward, error is: {} at {} degrees'.format(rmag, angle))
-			print('errlim_mag is', self.errlim_mag)
+		set_errors = self.calculate_total_error(target_output)
+		# the worst input set decides if the net has adapted
+		worst = np.abs(set_errors).argmax()
+		self.error_return = set_errors[worst]
+		self.error_mag = abs(self.error_return)
+		if _trace.debug:
+			_trace.emit('error', set_errors=set_errors, mag=self.error_mag, errlim_mag=self.errlim_mag)
 		
-		if mag < self.errlim_mag :
-			self.error_return = output_error
+		if self.error_mag < self.errlim_mag :
 			return -1
+		
+		# the command is the first output of the output layer, 
+		# taken before the weights change
+		commands = self.layers[self.num_layers - 2].outputs[:, 0]
+		if len(commands) == 1 :
+			vehicle_command = complex(commands[0])
+		else :
+			vehicle_command = commands.copy()
 
 		# walk backward through the layers to adjust weights
-		# First put output_error into final virtual layer, "error"
+		# First put the gradient of the error, E = mean of 0.5 |T - y|^2 
+		# over the input sets, into final virtual layer, "error".
+		# 2 dE/d(conj y) = (y - T) / N
+		final_outputs = self.layers[self.num_layers - 2].outputs
+		output_error = (final_outputs - self.targets) / len(final_outputs)
 		self.layers[self.num_layers - 1].setFinalError(output_error)
+		self.optimizer.tick()
 
 		# Then start from there and walk backwards to update the weights for the next round.
         # Calculate the derivative of the error with respect to the output of each layer neuron
         # dE/dyⱼ = Σ ∂E/∂zⱼ * ∂z/∂yⱼ = Σ ∂E/∂zⱼ * wᵢⱼ
+		# With complex values these are Wirtinger derivatives, see Layer.back_propagation.
 		# The error at the neuron output is passed backward 
-		# and reduced by the input weight. It is stored in the neuron input dictionary.
-		# Pass error back to input through rest of the layers
+		# through the conjugate weights. It is stored in the layer input_errors.
+		# Pass error back to input through every weighted layer, output layer first
 
 		for layer_idx in range(self.num_layers-2, 0, -1) : 
-			self.layers[layer_idx].back_propagation()
-			# so: start at output, put error into each neuron weight in layer/neuron dict
+			self.layers[layer_idx].back_propagation(self.layers[layer_idx + 1])
+			# so: start at output, put error into each neuron input of the layer
 			# Then go back one layer and do same for each neuron
 			
-		return 0
+		return vehicle_command
 		
+	# DEF: infer def of class NeuralNetCmplx
+	# Desc: commands for many input sets with the current weights, no
+	#	training. One forward pass, one matrix product per layer for the
+	#	whole batch, e.g. one input set per vehicle of a swarm.
+	# Parm: inputs - (N x inputs) array or list of input sets, normalized
+	#	as for step
+	# Return: complex array of N vehicle commands, the first output of
+	#	the output layer for each set
+	# Usage: public, simcore.SwarmSim.step
+	def infer(self, inputs):
+		previous_outputs = np.atleast_2d(np.asarray(inputs, dtype=np.complex128))
+		if self.backend == 'split' :
+			previous_outputs = (previous_outputs.real.astype(self.dtype), 
+				previous_outputs.imag.astype(self.dtype))
+		# the error layer is for training only
+		for layer in self.layers[:self.num_layers - 1] : 
+			previous_outputs = layer.feed_forward(previous_outputs)
+		return self.layers[self.num_layers - 2].outputs[:, 0].copy()
+
 	# DEF: calculate_total_error def of class NeuralNetCmplx
-	# Desc: calculate error over all input sets. 
-	#		NOTE: Currently, this code	assumes that there is 
-	#		only one input set and one output.
-	# Parm: target_output - goal of regression
-	# Return: sum of errors for all input sets.
+	# Desc: calculate error over all input sets and all outputs. 
+	#		The error of each output neuron for each set is kept 
+	#		in self.output_errors, (N x outputs). It is 0.5 * (T - y)^2,
+	#		its magnitude is the real error 0.5 * |T - y|^2 that is 
+	#		minimized, its angle shows the direction of the miss.
+	# Parm: target_output - goal of regression, a value, one value
+	#		per input set, or one value per set and output
+	# Return: array with the sum of output errors for each input set.
 	# Usage: called by step                                                                           
 	def calculate_total_error(self, target_output):
-		# NOTE: this calc is for only one output neuron
-		final_output = self.layers[self.num_layers - 2].neurons[0].output
+		final_outputs = self.layers[self.num_layers - 2].outputs
+		targets = np.asarray(target_output, dtype=np.complex128)
+		if targets.ndim == 1 :
+			targets = targets[:, None]	# one target per input set
+		self.targets = np.broadcast_to(targets, final_outputs.shape)
+		self.output_errors = 0.5 * (self.targets - final_outputs) ** 2
 		# add these up for all outputs
-		return 0.5 * (target_output - final_output) ** 2
+		return self.output_errors.sum(axis=1)
+
+	# DEF: save def of class NeuralNetCmplx
+	# Desc: write the weights and biases of every layer to a binary file.
+	#	Layout: WEIGHTS_MAGIC, a 4 byte little endian header length, a JSON
+	#	header of dtype and layer shapes, padding to a 64 byte boundary,
+	#	then the raw weights and bias of each layer in layer order.
+	# Parm: path - file to write
+	# Parm: dtype - 'complex128' or 'complex64'
+	# Usage: public, SimMap.menu_save
+	def save(self, path, dtype='complex128'):
+		shapes = list()
+		for layer in self.layers :
+			shapes.append({'type' : layer.layer_type, 'weights' : list(layer.weights.shape)})
+		header = json.dumps({'dtype' : dtype, 'layers' : shapes}).encode()
+		data_offset = -(-(len(WEIGHTS_MAGIC) + 4 + len(header)) // 64) * 64
+		with open(path, 'wb') as weights_file :
+			weights_file.write(WEIGHTS_MAGIC)
+			weights_file.write(struct.pack('<I', len(header)))
+			weights_file.write(header)
+			weights_file.write(bytes(data_offset - weights_file.tell()))
+			for layer in self.layers :
+				weights_file.write(layer.weights.astype(dtype).tobytes())
+				weights_file.write(layer.bias.astype(dtype).tobytes())
+
+	# DEF: load def of class NeuralNetCmplx
+	# Desc: memory map a file written by save. The layer weights and biases
+	#	become views of the mapped file, so nothing is read until used and 
+	#	processes that load the same file share its pages. 
+	#	The split backend copies the values into its float arrays.
+	# Parm: path - file to read
+	# Parm: mode - 'c' copy on write, training changes stay in memory,
+	#		'r' read only for inference
+	# Usage: public, SimMap.menu_load
+	def load(self, path, mode='c'):
+		with open(path, 'rb') as weights_file :
+			if weights_file.read(len(WEIGHTS_MAGIC)) != WEIGHTS_MAGIC :
+				print('Error: {} is not a weights file'.format(path))
+				error_exit()
+			header_len = struct.unpack('<I', weights_file.read(4))[0]
+			header = json.loads(weights_file.read(header_len))
+		data_offset = -(-(len(WEIGHTS_MAGIC) + 4 + header_len) // 64) * 64
+		
+		shapes = header['layers']
+		if [shape['weights'] for shape in shapes] \
+			!= [list(layer.weights.shape) for layer in self.layers] :
+			print('Error: {} does not match the network structure'.format(path))
+			error_exit()
+		
+		data = np.memmap(path, dtype=header['dtype'], mode=mode, offset=data_offset)
+		start = 0
+		for layer in self.layers :
+			rows, cols = layer.weights.shape
+			layer.weights = data[start:start + rows * cols].reshape(rows, cols)
+			start += rows * cols
+			layer.bias = data[start:start + rows]
+			start += rows
 
 # CLASS: Layer of module NeuralNetCmplx
-# Desc: a vertical layer of neurons. Create and support the neurons of this layer
+# Desc: a vertical layer of neurons. The neurons of a layer are held as
+#	one complex weight matrix, one row per neuron and one column per neuron
+#	of the previous layer, plus a bias vector. A forward pass is one matrix-vector product followed
+#	by a vectorized squash of the magnitudes.
 # Usage: NeuralNetCmplx.init
 class Layer:
 	# DEF: __init__ def of class Layer
-	# Parm: layer_id - the numeric id of this layer, a string
-	# Parm: layer_dict - a dictionary describing the layer:
-	# Parm: next_layer_dict - holds 
-	# Parm: learning_rate - manages rate of weight change during feedback			
-	# Usage: public - see *map.py
-	def __init__(self, layer_id, layer_dict, next_layer_dict, learning_rate):
+	# Desc: a layer is held as arrays. Weights and the feedback errors of
+	#	the inputs are (neurons x inputs) arrays, the weights as the config
+	#	lists them until connect wires them. The destinations are index
+	#	arrays: source neuron, destination neuron and destination input in 
+	#	the next layer, one entry per connection.
+	#	See compile_layer and expand_sizes for the two config forms.
+	# Parm: layer_id - the numeric id of this layer
+	# Parm: layer_type - inputs, hidden, output or error
+	# Parm: weights - complex (neurons x inputs) weight matrix
+	# Parm: bias - complex bias, one per neuron
+	# Parm: destinations - tuple of index arrays (source neuron, 
+	#		destination neuron, destination input), empty for the last layer
+	# Parm: optimizer - manages rate of weight change during feedback			
+	# Usage: compile_layer, expand_sizes
+	def __init__(self, layer_id, layer_type, weights, bias, destinations, optimizer):
 
 		self.layer_id = layer_id
-		self.layer_dict = layer_dict
-		self.next_layer_dict = next_layer_dict
-		self.learning_rate = learning_rate
-		
-		self.layer_type = layer_dict['type']  # type is input, hidden, or output
-		self.bias = complex(layer_dict['bias'])
-		self.neurons_dict = layer_dict['neurons']
+		self.optimizer = optimizer
+		self.layer_type = layer_type  # type is input, hidden, or output
 		
-		self.neurons = list()   # neurons in this layer
+		self.weights = np.asarray(weights, dtype=np.complex128)
+		self.neuron_count, self.num_inputs = self.weights.shape
+		self.bias = np.asarray(bias, dtype=np.complex128)
+		self.outputs = np.zeros((1, self.neuron_count), dtype=np.complex128)
+		self.inputs = np.zeros((1, self.num_inputs), dtype=np.complex128)
+		self.net = np.zeros((1, self.neuron_count), dtype=np.complex128)
+		# error fed back to each input, one row per input set
+		self.input_errors = np.zeros((1, self.num_inputs), dtype=np.complex128)
+		self.mask = None	# connected weights, None if all are
+		# per weight state of the optimizer, e.g. momentum
+		self.weights_state = optimizer.new_state(self.weights)
+		self.bias_state = optimizer.new_state(self.bias)
 		
-		# create the neurons for this layer
-		self.neuron_dict = layer_dict['neurons']
-		self.neuron_count = self.neuron_dict['count'] # number of neurons in this layer
-		for id in range(self.neuron_count):
-			self.neurons.append( Neuron(self.layer_id, self.bias, id, \
-				self.neuron_dict[str(id)], self.layer_type, learning_rate ))			
+		src_neuron, dest_neuron, dest_input = destinations
+		self.src_neuron = np.asarray(src_neuron, dtype=np.intp)
+		self.dest_neuron = np.asarray(dest_neuron, dtype=np.intp)
+		self.dest_input = np.asarray(dest_input, dtype=np.intp)
 	
     # DEF: feed_forward def of class Layer
 	# Desc: called layer by layer, layer outputs are next layer inputs.
-	# Parm: inputs - set of input values that go to each neuron in the layer
-	# Return: a list of computed output values, one per neuron in this layer 
+	#	An input layer passes one input signal through each neuron.
+	#	Other layers compute inputs @ weights.T + bias, then squash.
+	# Parm: inputs - (N x inputs) array, one row of input values per input set
+	# Return: (N x neurons) array of computed output values
 	# Usage: local
 	def feed_forward(self, inputs):
-		outputs = []
-		# support user input of single step
-		print('LAYER {} Type {} Bias {}'.format(self.layer_id, self.layer_type, self.bias))
-		for neuron_indx in range(self.neuron_count):
-			outputs.append(self.neurons[neuron_indx].feed_forward( inputs, neuron_indx ))
-		return outputs
+		if self.layer_type == "inputs" : # just return one input signal per neuron
+			self.outputs = inputs[:, :self.neuron_count].copy()
+		else :
+			# keep the inputs and net input z for back propagation
+			self.inputs = inputs[:, :self.num_inputs]
+			self.net = self.inputs @ self.weights.T + self.bias
+			# squash the magnitude to 0..1 (NOT -1..1, angle does that)
+			self.outputs = squash(self.net)
+		
+		# trace the weights and the output of each neuron
+		if _trace.debug:
+			_trace.emit('feed_forward', layer=self.layer_id, type=self.layer_type,
+				weights=self.weights.copy(), outputs=self.outputs)
+		return self.outputs
+	
+	# DEF: connect def of class Layer
+	# Desc: the destinations of the previous layer wire its neurons to the
+	#	input slots of this one. The config weight of input slot s of 
+	#	neuron n applies to the neuron that feeds that slot, so it moves
+	#	once to column source, W[n, source] += w[n, s]. After that the 
+	#	forward pass is inputs @ W.T for any wiring, input k is neuron k
+	#	of the previous layer. A slot no neuron feeds carries nothing and 
+	#	its weight is dropped. Weights that are not connections stay at 
+	#	zero during training.
+	# Parm: previous_layer - the layer that feeds this one
+	# Usage: NeuralNetCmplx.__init__
+	def connect(self, previous_layer):
+		source = previous_layer.src_neuron
+		dest = previous_layer.dest_neuron
+		slot = previous_layer.dest_input
+		weights = np.zeros((self.neuron_count, previous_layer.neuron_count), dtype=np.complex128)
+		np.add.at(weights, (dest, source), self.weights[dest, slot])
+		mask = np.zeros(weights.shape, dtype=bool)
+		mask[dest, source] = True
+		
+		self.weights = weights
+		self.num_inputs = previous_layer.neuron_count
+		self.inputs = np.zeros((1, self.num_inputs), dtype=np.complex128)
+		self.input_errors = np.zeros((1, self.num_inputs), dtype=np.complex128)
+		self.weights_state = self.optimizer.new_state(self.weights)
+		if mask.all() :
+			self.mask = None	# dense, nothing to mask
+		else :
+			self.mask = mask
 	
 	# DEF: setFinalError def of class Layer
-	# Parm: value of the final output error
+	# Desc: the gradient of the error with respect to each output goes
+	#	into the inputs of the virtual error layer
+	# Parm: output_error - (N x outputs) array, 2 * dE/d(conj y)
 	# Usage: local
 	def setFinalError(self, output_error):
-		error_neuron = self.neurons[self.neuron_count - 1]
-		error_neuron.setFinalError( output_error )
+		self.input_errors = output_error
+		if _trace.debug: _trace.emit('output_error', output_error=output_error)
 	
 	# DEF: back_propagation def of class layer
-	# Desc: for each neuron, sum the errors from connected inputs
-	# 		in the next layer. Use the sum to modify the input weights.
-	def back_propagation(self):
-		for neuron_id in range(self.neuron_count):
-			neuron = self.neurons[neuron_id]
-			neuron.back_propagation(self.neuron_dict[str(neuron_id)], self.next_layer_dict)
+	# Desc: complex gradient descent with Wirtinger derivatives.
+	#		For real error E and complex z the steepest descent direction 
+	#		is dE/d(conj z). With y = squash(z) = g(r) z / r, r = |z|,
+	#		g the logistic function and h(r) = g(r) / r:
+	#			dy/dz = h + r h' / 2
+	#			dy/d(conj z) = h' z^2 / (2 r)
+	#		so for the output gradient e = 2 dE/d(conj y) the net input gets
+	#			delta = e conj(dy/dz) + conj(e) dy/d(conj z)
+	#		As z = W x + b is analytic in W, b and x:
+	#			weight gradient = delta x^H, bias gradient = delta
+	#			error fed back to x = W^H delta, stored in input_errors
+	#		Gradients are summed over the input sets of the batch.
+	# Parm: next_layer - the layer this one feeds, holds the feedback errors
+	# Usage: NeuralNetCmplx.step
+	def back_propagation(self, next_layer):
+		# error at the output of each neuron, fed back by the next layer
+		output_error = next_layer.input_errors[:, :self.neuron_count]
+		
+		r = np.maximum(np.abs(self.net), 1e-12)
+		g = 1 / (1 + np.exp(-r))
+		h = g / r
+		dh = (g * (1 - g) * r - g) / (r * r)
+		dy_dz = h + r * dh / 2
+		dy_dzc = dh * self.net * self.net / (2 * r)
+		delta = output_error * np.conj(dy_dz) + np.conj(output_error) * dy_dzc
+		
+		# pass the error back before the weights change
+		self.input_errors = delta @ np.conj(self.weights)
+		
+		# Now adjust the input weights and bias of every neuron at once
+		grad = delta.T @ np.conj(self.inputs)
+		if self.mask is not None :
+			grad *= self.mask
+		self.optimizer.update(self.weights, grad, self.weights_state)
+		self.optimizer.update(self.bias, delta.sum(axis=0), self.bias_state)
+		if _trace.debug:
+			_trace.emit('back_propagation', layer=self.layer_id, delta=delta,
+				weights=self.weights.copy())
 			
 	# DEF: get_outputs def of class Layer
-	# Return: list of the output from each neuron 
+	# Return: list of the output from each neuron for the first input set
 	# Usage: public (print_state of class NeuralNetCmplx)
 	def get_outputs(self):
-		outputs = list()
-		for neuron in self.neurons:
-			# append output of each neuron to a list
-			outputs.append( neuron.output )
-		return outputs
-				
-# CLASS: Neuron of module NeuralNetCmplx
-# Desc: a single AI neuron - all weights and calculations
-class Neuron:
-	# DEF: __init__ of class Neuron
-	# Desc: create a neuron, connect outputs to next layer, set/adjust weights
-	# Parm: layer_id - number of this layer
-	# Parm: layer_bias - a complex value
-	# Parm: neuron_dict - dictionary of neuron configuration
-	# Parm: layer type: input, hidden, output
-	# Parm: learning_rate - controls rate of weight change
-	# Usage: created/referenced by class Layer
-	def __init__(self, layer_id, layer_bias, id, neuron_dict, layer_type, learning_rate):
-		self.layer_id = layer_id
-		self.neuron_id = id
-		self.bias = layer_bias		# complex
-		self.inputs_dict = neuron_dict['inputs']  # returns the backward prop err value
-		self.dest_dict = neuron_dict['destinations'] # list of output connections
-		self.type = layer_type
-		# expected value at output layer, S/(S+N) where N == 0
-		self.learning_rate = learning_rate
-		
-		self.num_inputs = self.inputs_dict['count']
-		self.inputs = [0j] * self.num_inputs
+		return list(self.outputs[0])
+
+# CLASS: SplitLayer of module NeuralNetCmplx
+# Desc: the same layer with the real and imaginary parts of the weights, 
+#	bias and signals held as separate contiguous float arrays. Signals 
+#	between split layers are (real, imag) pairs of (N x neurons) arrays.
+#	Every complex product is done with real matrix products:
+#		(A + jB)(p + jq) = (Ap - Bq) + j(Bp + Aq)
+#	weights and bias read back as complex, assigning them splits them.
+# Usage: NeuralNetCmplx.__init__ when the config "backend" is "split"
+class SplitLayer(Layer):
+	# DEF: __init__ def of class SplitLayer
+	# Parm: layer - a complex Layer to take the structure and values from
+	# Parm: dtype - float type of the arrays, e.g. 'float32'
+	def __init__(self, layer, dtype):
+		self.dtype = np.dtype(dtype)
+		self.layer_id = layer.layer_id
+		self.layer_type = layer.layer_type
+		self.optimizer = layer.optimizer
+		self.neuron_count = layer.neuron_count
+		self.num_inputs = layer.num_inputs
+		self.weights = layer.weights
+		self.bias = layer.bias
+		self.src_neuron = layer.src_neuron
+		self.dest_neuron = layer.dest_neuron
+		self.dest_input = layer.dest_input
+		self.mask = layer.mask
 		
-		# read in the initial weight values
-		self.weights = [(0+0j)] * self.num_inputs    # each input has a weight
-		for wt_cnt in range(self.num_inputs) :
-			cmp_num_str = self.inputs_dict[str(wt_cnt)]
-			self.weights[wt_cnt] = complex(cmp_num_str[0]) # convert string to complex
-		self.output = (0+0j)
+		empty = np.zeros((1, self.neuron_count), dtype=self.dtype)
+		self.split_outputs = (empty, empty)
+		self.net = (empty, empty)
+		empty = np.zeros((1, self.num_inputs), dtype=self.dtype)
+		self.inputs = (empty, empty)
+		self.input_errors = (empty, empty)
+		# per weight state of the optimizer, the parts step as one
+		# complex weight, see optimizers.update_split
+		self.weights_state = self.optimizer.new_split_state(self.weights_re)
+		self.bias_state = self.optimizer.new_split_state(self.bias_re)
+
+	# weights and bias as complex, for save, load and tracing
+	@property
+	def weights(self):
+		return self.weights_re + 1j * self.weights_im
 	
-	# DEF: feed_forward of class Neuron
-	# Desc: for an input set, compute the output as sum of weighted inputs.
-	#     Always squash the output to limit range to 0:1. 
-	#     If complex just squash the magnitude
-	# Parm: inputs - either from sensors or outputs from previous layer
-	# Return: inputs summed then squashed
-	# Usage: layer.feedforward
-	def feed_forward(self, inputs, neuron_index ):
-		if self.type == "inputs" : # just return this one input signal
-			self.output = inputs[0]
+	@weights.setter
+	def weights(self, value):
+		self.weights_re = np.ascontiguousarray(np.real(value), dtype=self.dtype)
+		self.weights_im = np.ascontiguousarray(np.imag(value), dtype=self.dtype)
+	
+	@property
+	def bias(self):
+		return self.bias_re + 1j * self.bias_im
+	
+	@bias.setter
+	def bias(self, value):
+		self.bias_re = np.ascontiguousarray(np.real(value), dtype=self.dtype)
+		self.bias_im = np.ascontiguousarray(np.imag(value), dtype=self.dtype)
+	
+	# complex outputs, for the error at the output layer
+	@property
+	def outputs(self):
+		return self.split_outputs[0] + 1j * self.split_outputs[1]
+
+    # DEF: feed_forward def of class SplitLayer
+	# Parm: inputs - (real, imag) pair of (N x inputs) arrays
+	# Return: (real, imag) pair of (N x neurons) arrays
+	# Usage: local
+	def feed_forward(self, inputs):
+		in_re, in_im = inputs
+		if self.layer_type == "inputs" : # just return one input signal per neuron
+			self.split_outputs = (in_re[:, :self.neuron_count], in_im[:, :self.neuron_count])
 		else :
-			self.output = self.bias
-			for ndx in range(self.num_inputs):
-				self.output += (inputs[ndx] * self.weights[ndx])
-			# squash the magnitude to 0..1 (NOT -1..1, angle does that)
-			# This is the sigmoid function.
-			self.output = self.squash(self.output)
+			p = in_re[:, :self.num_inputs]
+			q = in_im[:, :self.num_inputs]
+			self.inputs = (p, q)
+			net_re = p @ self.weights_re.T - q @ self.weights_im.T + self.bias_re
+			net_im = p @ self.weights_im.T + q @ self.weights_re.T + self.bias_im
+			self.net = (net_re, net_im)
+			# squash the magnitude to 0..1, keep the angle
+			r = np.maximum(np.sqrt(net_re * net_re + net_im * net_im), 1e-12)
+			scale = 1 / (1 + np.exp(-r)) / r
+			self.split_outputs = (net_re * scale, net_im * scale)
 		
-		# print each input, weight and the output
-		if TEST:
-			print('Neuron {}'.format(neuron_index))
-			for ndx in range(self.num_inputs):
-				inmag,inang = cmplxToRect(inputs[ndx])
-				wtmag,wtang = cmplxToRect(self.weights[ndx])
-				print('    input {}: {} at {} deg  weight {} at {} deg.'.format(ndx, inmag, inang, wtmag, wtang))
-			mag,ang = cmplxToRect(self.output)
-			print('    output {} at {} degrees'.format( mag, ang))
-			print()
-		return self.output
-		
-	# DEF: squash def of class Neuron
-    # Apply the logistic function to squash the output of the neutron
-	# This is complex math so only squash the magnitude.
-	# Usage: local
-	def squash(self, total_net_input):
-		mag, angle = cmath.polar(self.output)
-		mag =  1 / (1 + math.exp(-abs(mag)))
-		# back to complex with new magnitude
-		return complex(mag, angle)
-
-	# DEF: setFinalError def of class Neuron
-	# Parm: value of the final output error
+		if _trace.debug:
+			_trace.emit('feed_forward', layer=self.layer_id, type=self.layer_type,
+				weights=self.weights, outputs=self.outputs)
+		return self.split_outputs
+	
+	# DEF: setFinalError def of class SplitLayer
+	# Parm: output_error - complex (N x outputs) array, 2 * dE/d(conj y)
 	# Usage: local
 	def setFinalError(self, output_error):
-		self.inputs_dict['0'][1] = output_error
-		# this must be called for each layer/neuron. is it?
-		print('Output error: ', output_error)
+		self.input_errors = (output_error.real.astype(self.dtype), 
+			output_error.imag.astype(self.dtype))
+		if _trace.debug: _trace.emit('output_error', output_error=output_error)
+	
+	# DEF: back_propagation def of class SplitLayer
+	# Desc: the Wirtinger gradient of Layer.back_propagation written out
+	#	in real and imaginary parts. dy/dz = a is real, dy/d(conj z) = c.
+	# Parm: next_layer - the layer this one feeds, holds the feedback errors
+	# Usage: NeuralNetCmplx.step
+	def back_propagation(self, next_layer):
+		err_re = next_layer.input_errors[0][:, :self.neuron_count]
+		err_im = next_layer.input_errors[1][:, :self.neuron_count]
+		net_re, net_im = self.net
+		p, q = self.inputs
+		
+		r = np.maximum(np.sqrt(net_re * net_re + net_im * net_im), 1e-12)
+		g = 1 / (1 + np.exp(-r))
+		h = g / r
+		dh = (g * (1 - g) * r - g) / (r * r)
+		a = h + r * dh / 2
+		c_scale = dh / (2 * r)
+		c_re = c_scale * (net_re * net_re - net_im * net_im)
+		c_im = c_scale * 2 * net_re * net_im
+		# delta = e a + conj(e) c
+		delta_re = err_re * a + err_re * c_re + err_im * c_im
+		delta_im = err_im * a + err_re * c_im - err_im * c_re
+		
+		# pass the error back through conj(W) before the weights change
+		self.input_errors = (delta_re @ self.weights_re + delta_im @ self.weights_im,
+			delta_im @ self.weights_re - delta_re @ self.weights_im)
+		
+		# weight gradient delta x^H, bias gradient delta
+		grad_re = delta_re.T @ p + delta_im.T @ q
+		grad_im = delta_im.T @ p - delta_re.T @ q
+		if self.mask is not None :
+			grad_re *= self.mask
+			grad_im *= self.mask
+		self.optimizer.update_split(self.weights_re, self.weights_im, grad_re, grad_im, 
+			self.weights_state)
+		self.optimizer.update_split(self.bias_re, self.bias_im, delta_re.sum(axis=0), 
+			delta_im.sum(axis=0), self.bias_state)
+		if _trace.debug:
+			_trace.emit('back_propagation', layer=self.layer_id, 
+				delta=delta_re + 1j * delta_im, weights=self.weights)
+
+# DEF: squash of module NeuralNetCmplx
+# Desc: Apply the logistic function to squash the output of the neurons.
+#	This is complex math so only squash the magnitude, keep the phase.
+# Parm: total_net_input - array of complex neuron sums
+# Return: array of complex, magnitude in 0.5..1, same angle
+# Usage: Layer.feed_forward
+def squash(total_net_input):
+	mag = np.abs(total_net_input)
+	return (1 / (1 + np.exp(-mag))) * np.exp(1j * np.angle(total_net_input))
 
-	# DEF:  back_propagation of class neuron
-	# Desc: gradient descent feed_back for each neuron output
-	#		For each neuron the output error is the sum the errors 
-	#		from next layer inputs that are connected to this neuron output.
-	# 		New weight = input weight - sum * learning rate
-	# 		To start, already put final error into the 'error' layer neuron 0, input 0.
-	#		See setFinalError()
-	# Parm: neuron_dict - provides destinations info for this neuron
-	# Parm: next_layer_dict - dictionary of next layer neuron dictionaries 
-	#		where the feedback error values are. 
-	#		They were calculated during forward propagation.
-	# Usage: class Layer.back_propagation
-	def back_propagation(self, neuron_dict, next_layer_dict) :
-		dest_dict = neuron_dict['destinations']
+
+# DEF: compile_layer of module NeuralNetCmplx
+# Desc: compile one verbose layer dictionary into a Layer. Every neuron 
+#	lists its input weights and its destinations in the next layer.
+# Parm: layer_id - the numeric id of this layer
+# Parm: layer_dict - a dictionary describing the layer
+# Parm: next_layer_dict - the next layer, checks the destinations. 
+#		None for the last layer.
+# Parm: optimizer - manages rate of weight change during feedback
+# Return: a Layer
+# Usage: NeuralNetCmplx.__init__
+def compile_layer(layer_id, layer_dict, next_layer_dict, optimizer):
+	neuron_dict = layer_dict['neurons']
+	neuron_count = neuron_dict['count'] # number of neurons in this layer
+	
+	# widest neuron sets the number of weight columns, 
+	# missing inputs of narrower neurons stay at a zero weight
+	num_inputs = max(neuron_dict[str(id)]['inputs']['count'] for id in range(neuron_count))
+	
+	# read in the initial weight values, one row per neuron
+	#	"0" : ["1.0+0j","0+0j"] which are: input weight, error fed back to this input
+	weights = np.zeros((neuron_count, num_inputs), dtype=np.complex128)
+	for id in range(neuron_count):
+		inputs_dict = neuron_dict[str(id)]['inputs']
+		for wt_cnt in range(inputs_dict['count']):
+			cmp_num_str = inputs_dict[str(wt_cnt)]
+			weights[id, wt_cnt] = complex(cmp_num_str[0]) # convert string to complex
+	bias = np.full(neuron_count, complex(layer_dict['bias']), dtype=np.complex128)
+	
+	# compile the destinations, list entries are pairs: neuron id and input id
+	#			"destinations" :
+	#				{
+	#				"count" : 3, 
+	#				"dests" : [0, 0, 1, 0, 2, 0]
+	#				}
+	src_neuron = list()
+	dests = list()
+	if next_layer_dict != None :
+		for id in range(neuron_count):
+			dest_list = neuron_dict[str(id)]['destinations']['dests']
+			for pair in range(0, len(dest_list) - 1, 2):
+				src_neuron.append(id)
+				dests.append(dest_list[pair:pair + 2])
+	dests = np.array(dests, dtype=np.intp).reshape(-1, 2)
+	
+	if next_layer_dict != None and len(dests) > 0 :
 		next_neurons_dict = next_layer_dict['neurons']
+		next_inputs = max(next_neurons_dict[str(id)]['inputs']['count'] 
+			for id in range(next_neurons_dict['count']))
+		if dests[:, 0].max() >= next_neurons_dict['count'] \
+			or dests[:, 1].max() >= next_inputs :
+			print('Error: layer {} has a destination past the next layer'.format(layer_id))
+			error_exit()
+	
+	return Layer(layer_id, layer_dict['type'], weights, bias, 
+		(src_neuron, dests[:, 0], dests[:, 1]), optimizer)
 
-		# collect one sum of all destination inputs back to this neuron
-		error_sum = (0+0j)
-		
-		# to collect and sum errors: walk destinations list in the config file
-		# list entries are pairs: neuron id and input id
-		#	"neurons" :
-		#		"count" : 3,
-		#		"0",
-		#			{
-		#			"destinations" :
-		#				{
-		#				"count" : 3, 
-		#				"dests" : [0, 0, 1, 0, 2, 0]
-		#				}
+# DEF: expand_sizes of module NeuralNetCmplx
+# Desc: expand the compact structure form into dense layers in memory.
+#	"sizes" : [3, 64, 64, 1] gives an input layer of 3, two hidden layers
+#	of 64 and an output layer of 1. Every neuron feeds every neuron of 
+#	the next layer. The virtual "error" layer is added after the output.
+#	"init" selects the weight values:
+#		"constant" - every weight is "weight", default "0.5+0j"
+#		"uniform" - real and imag parts uniform in +/- "scale",
+#			default scale is 1/sqrt(inputs)
+#		"glorot" - complex normal, variance 2/(inputs + outputs)
+#	"seed" makes the random weights repeatable, "bias" is the layer bias.
+# Parm: structure - the structure dictionary of the config
+# Parm: optimizer - manages rate of weight change during feedback
+# Return: list of Layers, input layer first and error layer last
+# Usage: NeuralNetCmplx.__init__
+def expand_sizes(structure, optimizer):
+	sizes = structure['sizes']
+	init = structure.get('init', 'glorot')
+	rng = np.random.default_rng(structure.get('seed'))
+	bias = complex(structure.get('bias', '0+0j'))
+	
+	# the output layer also feeds one error neuron per output
+	sizes = list(sizes) + [sizes[-1]]
+	last = len(sizes) - 1
+	layers = list()
+	for id in range(len(sizes)):
+		neuron_count = sizes[id]
+		if id == 0 :
+			layer_type = 'inputs'
+		elif id == last - 1 :
+			layer_type = 'output'
+		elif id == last :
+			layer_type = 'error'
+		else :
+			layer_type = 'hidden'
 		
-		# get the destinations list count (list size) and then the list
-		dest_count = neuron_dict['destinations']['count']
-		dest_dests_list = neuron_dict['destinations']['dests']
+		# input and error neurons have one input with a weight of 1
+		if id == 0 or id == last :
+			weights = np.ones((neuron_count, 1), dtype=np.complex128)
+		else :
+			fan_in = sizes[id - 1]
+			shape = (neuron_count, fan_in)
+			if init == 'constant' :
+				weights = np.full(shape, complex(structure.get('weight', '0.5+0j')))
+			elif init == 'uniform' :
+				scale = structure.get('scale', 1 / math.sqrt(fan_in))
+				weights = rng.uniform(-scale, scale, shape) + 1j * rng.uniform(-scale, scale, shape)
+			elif init == 'glorot' :
+				sigma = math.sqrt(1 / (fan_in + neuron_count))	# per real and imag part
+				weights = rng.normal(0, sigma, shape) + 1j * rng.normal(0, sigma, shape)
+			else :
+				print('Error: unknown init {}'.format(init))
+				error_exit()
 		
-		# apply the feedback error at the output to modify each input weight
-		for dests in range(0,dest_count,2):
-			# list entries are pairs: neuron id and input id
-			dest_neuron_id = str(dest_dests_list[dests])
-			dest_input_id  = str(dest_dests_list[dests + 1])
-			# "inputs" :
-			#	{
-			#	"count" : 1,
-			#	"0" : ["1.0+0j","0+0j"] which are: input weight, error fed back to this input]
-			#	},
-			dest_neuron_inputs_dict = next_neurons_dict[dest_neuron_id]['inputs']
-			error = complex(dest_neuron_inputs_dict[dest_neuron_id][1])
-			# add all the next layer errors together to feed back total error for this neuron
-			error_sum =  error_sum + error
-			
-		# Now adjust the input weights of this neuron
-		print('error sum, before weights:', error_sum, self.weights)
-		for w_index in range(self.num_inputs):
-			self.weights[w_index] -= error_sum * self.learning_rate
-		print('after weights:', self.weights)
+		# dense connections: neuron n feeds input n of every next neuron,
+		# output neuron n feeds only error neuron n
+		if id == last :
+			destinations = ((), (), ())
+		elif id == last - 1 :
+			src = np.arange(neuron_count)
+			destinations = (src, src, np.zeros(neuron_count, dtype=np.intp))
+		else :
+			next_count = sizes[id + 1]
+			src = np.repeat(np.arange(neuron_count), next_count)
+			destinations = (src, np.tile(np.arange(next_count), neuron_count), src)
+		layers.append(Layer(id, layer_type, weights, 
+			np.full(neuron_count, bias), destinations, optimizer))
+	return layers
 
 # DEF: cmplxToRect
 # Desc: convert complex # to mag,degrees with accuracy to 5 digits
@@ -419,8 +819,7 @@ def angle(value):
 
 # DEF: error_exit of module NerualNetCmplx.py
 def error_exit() :
-	pygame.quit()
-	sys.exit(0)
+	sys.exit(1)
 
 # DEF: print_complex of module NeuralNetCmplx
 # Desc: convert complex to mag,degrees and round to 5 places then print
@@ -430,6 +829,70 @@ def print_complex(value):
 	angle = int(10000 * (radians * 180 / cmath.pi)) / 10000
 	mag = int(10000 * mag) / 10000
 	print(mag, angle)
+
+# DEF: wiring_check of module NeuralNetCmplx
+# Desc: check that a hand wired net computes what its destinations say.
+#	Builds a net whose destinations shuffle the input slots, runs it
+#	through both backends and compares the outputs with a neuron by 
+#	neuron sum over the input slots, slot s of neuron n carrying the 
+#	neurons whose destinations name (n, s).
+# Parm: seed - random weights and wiring
+# Return: largest difference from the neuron by neuron outputs
+# Usage: python NeuralNetCmplx.py
+def wiring_check(seed=1):
+	rng = np.random.default_rng(seed)
+	sizes = [3, 4, 2]
+	layers = {'count' : len(sizes) + 1}
+	wiring = list()		# per layer: (source, dest neuron, dest input)
+	for id, count in enumerate(sizes + [1]) :
+		next_count = (sizes + [1, 0])[id + 1]
+		inputs = 1 if id == 0 or id == len(sizes) else sizes[id - 1]
+		neurons = {'count' : count}
+		links = list()
+		for n in range(count) :
+			weights = rng.normal(size=inputs) + 1j * rng.normal(size=inputs)
+			dests = list()
+			if next_count :
+				# a random slot of every next neuron, 
+				# output neurons feed error neuron 0 like the shipped config
+				for d in range(next_count) :
+					slot = 0 if id == len(sizes) - 1 else int(rng.integers(count))
+					dests += [d, slot]
+					links.append((n, d, slot))
+			neurons[str(n)] = {'inputs' : dict([('count', inputs)] + 
+				[(str(k), [str(w), '0+0j']) for k, w in enumerate(weights)]),
+				'destinations' : {'count' : len(dests), 'dests' : dests}}
+		layer_type = 'inputs' if id == 0 else 'error' if id == len(sizes) \
+			else 'output' if id == len(sizes) - 1 else 'hidden'
+		layers[str(id)] = {'type' : layer_type, 'bias' : '0.1+0.2j', 'neurons' : neurons}
+		wiring.append(links)
+	config = {'test' : 'false', 'test set count' : sizes[-1], 'learning rate' : 0.01,
+		'cycle limit' : 1, 'error limit mag' : 0.01, 'error limit ang' : 1,
+		'structure' : {'layers' : layers}}
+	inputs = rng.normal(size=(5, sizes[0])) + 1j * rng.normal(size=(5, sizes[0]))
+	
+	# neuron by neuron, the slots filled from the destinations
+	signals = inputs
+	for id in range(1, len(sizes)) :
+		neurons = layers[str(id)]['neurons']
+		outputs = np.empty((len(inputs), sizes[id]), dtype=np.complex128)
+		for n in range(sizes[id]) :
+			weights = neurons[str(n)]['inputs']
+			net = np.full(len(inputs), complex(layers[str(id)]['bias']))
+			for source, dest, slot in wiring[id - 1] :
+				if dest == n :
+					net += complex(weights[str(slot)][0]) * signals[:, source]
+			outputs[:, n] = squash(net)
+		signals = outputs
+	
+	worst = 0.0
+	for backend in ('complex', 'split') :
+		config['backend'] = backend
+		config['dtype'] = 'float64'
+		net = NeuralNetCmplx(config)
+		net.infer(inputs)
+		worst = max(worst, np.abs(net.layers[len(sizes) - 1].outputs - signals).max())
+	return worst
 		
 # ------------------Supplemental Information ---------------------------	
 #
@@ -493,3 +956,10 @@ def print_complex(value):
 #	return output * (1 - output)
 
 
+
+if __name__ == '__main__' :
+	difference = wiring_check()
+	print('hand wired net differs from the neuron by neuron sums by {:.3g}'.format(difference))
+	if difference > 1e-9 :
+		print('Error: hand wired net is not wired as its destinations say')
+		error_exit()
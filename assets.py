@@ -0,0 +1,84 @@
+# Module: assets.py
+# Desc: the images of the program, loaded once and shared.
+#	image decodes a .png and converts it to the display format the
+#	first time it is asked for, later calls return the same surface.
+#	Rebuilding a map does not decode anything again. Users must not
+#	draw on a shared surface.
+#	The small tiles, all 20 x 20, are also packed side by side into
+#	one atlas surface. Drawing several tiles from the atlas is one
+#	blits call, see Atlas.blits.
+#	The display mode must be set before the first load, convert_alpha
+#	needs it.
+#
+# Author: Brad Denniston
+# Version: 0.1, 18 Oct 2026
+
+import pygame
+
+# tiles packed into the atlas
+TILES = ("sand.png", "hill.png", "grass.png", "DBn.png")
+
+# loaded images by file name
+_images = dict()
+_atlas = None
+
+# DEF: image of module assets
+# Desc: a .png picture, loaded on first use
+# Parm: name - file name, local directory only
+# Return: pygame.Surface, None if it can't be loaded
+def image(name) :
+	if name not in _images :
+		try:
+			_images[name] = pygame.image.load(name).convert_alpha()  # in local directory
+		except pygame.error :
+			print('Cannot load image:', name)
+			return None
+	return _images[name]
+
+# DEF: atlas of module assets
+# Desc: the atlas of TILES, built on first use
+# Return: Atlas
+def atlas() :
+	global _atlas
+	if _atlas is None :
+		_atlas = Atlas(TILES)
+	return _atlas
+
+# CLASS: Atlas of module assets
+# Desc: tiles packed left to right on one surface
+# Usage: atlas()
+class Atlas :
+	# DEF: __init__ of class Atlas
+	# Parm: names - tile file names
+	def __init__(self, names) :
+		tiles = [image(name) for name in names]
+		width = sum(tile.get_width() for tile in tiles)
+		height = max(tile.get_height() for tile in tiles)
+		self.surface = pygame.Surface((width, height), pygame.SRCALPHA).convert_alpha()
+		self.areas = dict()		# name : rect of the tile in surface
+		x = 0
+		for name, tile in zip(names, tiles) :
+			self.areas[name] = self.surface.blit(tile, (x, 0))
+			x += tile.get_width()
+
+	# DEF: blit of class Atlas
+	# Desc: draw one tile
+	# Parm: screen - surface to draw on
+	# Parm: name - tile file name
+	# Parm: location - x, y of the top left corner on screen
+	# Parm: clip - rect of the screen the tile may cover, None for all
+	# Return: the screen rect drawn
+	def blit(self, screen, name, location, clip=None) :
+		screen.set_clip(clip)
+		drawn = screen.blit(self.surface, location, self.areas[name])
+		screen.set_clip(None)
+		return drawn
+
+	# DEF: blits of class Atlas
+	# Desc: draw several tiles in one call
+	# Parm: screen - surface to draw on
+	# Parm: tiles - sequence of (name, location)
+	# Return: list of the screen rects drawn
+	# Usage: render.Background.draw_tiles
+	def blits(self, screen, tiles) :
+		return screen.blits([(self.surface, location, self.areas[name]) for name, location in tiles])
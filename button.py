@@ -1,16 +1,32 @@
 # Module:	button.py
 #
 # Description: creates and supports a clickable button object
+#	A button is drawn from a face, a surface with its border and text
+#	rendered once per (label, border width) and kept. The font is
+#	looked up once per program, see get_font.
 #
 # Author: Brad Denniston
-# Version: 0.1, 02 Dec 2018
+# Version: 0.2, 18 Oct 2026
 
 import pygame
 from pygame.locals import *
 
+# fonts by (name, size), SysFont searches the system fonts on every call
+_fonts = dict()
+
+# DEF: get_font of module button
+# Desc: a system font, made on first use
+# Parm: name, size - as for pygame.font.SysFont
+# Return: pygame.font.Font
+def get_font(name, size) :
+	key = (name, size)
+	if key not in _fonts :
+		_fonts[key] = pygame.font.SysFont(name, size)
+	return _fonts[key]
+
 # Button - class of module button
 # Desc: draw and manage a button
-# Usage: menu.draw_menu
+# Usage: desertmap.Menu.build_menu
 class Button() :
 	# Button.__init___
 	# Parm: text - text to display in the button
@@ -21,7 +37,7 @@ class Button() :
 	# Parm: h - height of the button
 	# Parm: border_size - width of the button border
 	# Parm: base_color - button color
-	# Usage: public, menu.draw_menu
+	# Usage: public, desertmap.Menu.build_menu
 	def __init__(self, text, screen, x, y, w, h, border_size, base_color ):
 		self.screen = screen
 		self.text = text
@@ -30,6 +46,7 @@ class Button() :
 		self.w = w
 		self.h = h
 		self.border_size = border_size
+		self.rect = pygame.Rect(x, y, w, h)	# area the button draws on
 		self.textx = x + border_size
 		self.texty = y + border_size
 		self.textw = w - self.border_size * 2
@@ -37,50 +54,62 @@ class Button() :
 		self.border_color = (0,0,0) # can be changed by external reference
 		self.base_color = base_color  # color when not clicked or hovered over
 		self.current_color = self.base_color
+		self.faces = dict()		# (text, border width) : surface
+		self.border_width = 0
 		self.draw(0)
 
 	# draw def of class Button
 	# Parm: border_width - width of the border around the button
+	# Return: the screen rect drawn
 	# Usage: public
 	def draw(self, border_width) :
-		pygame.draw.rect( self.screen, self.border_color, [self.x, self.y, self.w, self.h])
+		self.border_width = border_width
+		key = (self.text, border_width)
+		if key not in self.faces :
+			self.faces[key] = self.make_face(border_width)
+		return self.screen.blit(self.faces[key], self.rect)
+
+	# make_face def of class Button
+	# Desc: render the button, border and text, on its own surface
+	# Parm: border_width - width of the border around the button
+	# Return: surface the size of the button
+	# Usage: draw
+	def make_face(self, border_width) :
+		face = pygame.Surface((self.rect.width, self.rect.height))
+		face.fill(self.border_color)
 		bw = border_width/2
-		pygame.draw.rect( self.screen, self.base_color,\
-				(self.textx + bw, self.texty + bw, self.textw - border_width, 
+		pygame.draw.rect( face, self.base_color,\
+				(self.textx - self.x + bw, self.texty - self.y + bw, self.textw - border_width,
 				self.texth - border_width))
-		button_font = pygame.font.SysFont("helvetica", 14)
+		button_font = get_font("helvetica", 14)
 
 		# button_text = button_font.render(self.text, True, self.base_color)
 		button_text = button_font.render(self.text, True, (80,80,80))
-		text_loc = ( (self.textx + 4), (self.texty + self.texth/4))
-		self.screen.blit(button_text, text_loc)         
-        
+		text_loc = ( (self.textx - self.x + 4), (self.texty - self.y + self.texth/4))
+		face.blit(button_text, text_loc)
+		return face
+
+	# contains def of class Button
+	# Desc: is x, y inside the button
+	# Usage: check_down
+	def contains(self, x, y) :
+		return ( self.x < x and (self.x + self.w) > x \
+		and ( self.y < y and (self.y + self.h) > y ) )
+
 	# check_down def of class Button
 	# Desc: respond to mouse click down
-	# Usage: public
+	# Usage: desertmap.Menu.check_menu
 	def check_down(self, x, y):
-		if ( self.x < x and (self.x + self.w) > x \
-		and ( self.y < y and (self.y + self.h) > y ) ) :
+		if self.contains(x, y) :
 			# show more border
 			self.draw(4)
 			return self.text
 		return None
         
-	# check_up def of class Button
-	# Desc: respond to mouse button going up
-	# Parm: x - number of pixels to right of 0
-	# Parm: y - number of pixels down from top
-	# Usage: public
-	def check_up(self, x, y):
-		if ( self.x < x and (self.x + self.w) > x \
-		and ( self.y < y and (self.y + self.h) > y ) ) :
-			# reset border width
-			self.draw(0)
-			return None
-		return 'scene'
-	
 	# set_text setter of class Button
-	# Desc: change the text of this button
+	# Desc: change the text of this button and redraw it
+	# Return: the screen rect drawn
 	def set_text( self, new_text ):
 		self.text = new_text
-        
\ No newline at end of file
+		return self.draw(self.border_width)
+        
\ No newline at end of file
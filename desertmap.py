@@ -1,9 +1,10 @@
 # Module: desertmap.py
 # Desc: manage the screen - map, menu, help
 # Classes:
-#	class SimMap - draws the frame and menu
+#	class SimMap - draws the frame and menu, runs a simcore.Sim
 #	class Help - display help file in multiple screens
 #	class Menu - display the menu, return user selections
+#	class Hills - simcore.HillStore that draws its hills
 #
 #	Author: Brad Denniston
 #	Version: 0.3, 22 Nov 2018
@@ -16,20 +17,17 @@
 # import python modules
 import random
 import copy  
+import os
 import pygame
-import cmath
 
 # import dunebuggy modules
+import assets
 import button
+import render
 import vehicle
-import sensors
+import simcore
 import tools		# debug support
 
-# choose the complex math version
-import NeuralNetCmplx
-# or choose the real math version: 
-# import NeuralNet
-
 import pprint
 
 SAND  = (242,234,193)
@@ -41,11 +39,8 @@ BLUE  = (  0,  0,255)
 GRASS = (64,128,  0)
 GRAY  = (128,128,128)
 
-SIZE = 10  # 1/2 width and height of a 20x20
+SIZE = simcore.HILL_SIZE  # 1/2 width and height of a 20x20
 
-if not pygame.font.get_init() :
-    pygame.font.init()
-   
 TEST = False
 
 # SimMap class of module desertmap
@@ -61,6 +56,8 @@ class SimMap:
 	def __init__(self, config):
 		if config['test'] == 'true' :
 			TEST =  True
+		if not pygame.font.get_init() :
+			pygame.font.init()
 			
 		self.complex = True
 		self.sprites = []       # sprite list
@@ -74,13 +71,16 @@ class SimMap:
 		self.screen = None
 		self.hills = None
 		self.new_frame() # sets self.screen, menu, hills
-		self.vehicle = vehicle.Vehicle( self.screen, config )
-		self.sensors = sensors.Sensors(self.vehicle, self.hills, config)
+		self.vehicle = vehicle.Vehicle( self.screen, config, self.dirty, self.background )
 		self.debug = tools.Debug( config )
 		self.AIRun = False
-		self.drive_mode = 'Manual'
 
-		self.AI = NeuralNetCmplx.NeuralNetCmplx(config)
+		# the simulation, this map draws it
+		self.sim = simcore.Sim(config, self.hills, self.vehicle)
+		self.sensors = self.sim.sensors
+		self.AI = self.sim.AI
+		self.weights_file = config.get('weights file', 'ailab1-weights.bin')
+		self.hills_file = config.get('hills file', 'ailab1-hills.npy')
 
 			
     # new_frame def of class SimMap
@@ -88,20 +88,28 @@ class SimMap:
 	#	Does set_mode( resolution=(0,0), flags=0, depth=0) 
 	#	which creates a display surface with resolution( width, height)
 	#	flags: depth and color bits (don't use) 
+	#	Everything drawn after this is pushed to the display by
+	#	self.dirty, see render.
 	# Usage: __init__()
 	def new_frame(self):
 		self.screen = pygame.display.set_mode((self.map_width,
                                  self.map_height + self.menu_height))
 		self.screen.fill(self.map_color)
-		pygame.display.set_icon(pygame.image.load("DBn.png"))
+		self.dirty = render.DirtyRects(self.screen)
+		# terrain and hills, sprites are drawn over it
+		self.background = render.Background(self.screen,
+			(0, self.menu_height, self.map_width, self.map_height), self.map_color, self.dirty)
+		pygame.display.set_icon(assets.image("DBn.png"))
 		pygame.display.set_caption("Dune Buggy")
 
-		self.hills = Hills(self.screen, self.map_height) # an object of hills
-		exit_loc = [self.map_width-1, self.menu_height + 8]
-		if TEST: print('exit loc = ', exit_loc)
-		self.hills.add(exit_loc)
+		# map y is up from the bottom of the map area, the same frame
+		# for the hills, the vehicle and simcore
+		map_bottom = self.menu_height + self.map_height
+		self.hills = Hills(self.background, map_bottom) # an object of hills
+		if TEST: print('exit loc = ', simcore.EXIT_LOC)
+		self.hills.add(*simcore.EXIT_LOC)
 		# now put a menu across the top of the new screen
-		self.menu = Menu(self.screen, self.menu_height, self.map_color)
+		self.menu = Menu(self.screen, self.menu_height, self.map_color, self.dirty)
 		
    	# direction_key def of class SimMap
 	# Desc: change sprite action according to which key is down
@@ -128,11 +136,14 @@ class SimMap:
 			buttons = pygame.mouse.get_pressed()
 
 			if buttons[2] == True : # right button pushed, delete this hill
-				self.hills.remove(location)
+				self.hills.remove_at(location)
+				# the vehicle may have been under it
+				self.vehicle.draw(self.vehicle.sloc_rect)
 				return
 			
 			elif buttons[0] == True : # left button pushed, add a hill here
-				self.hills.add(location)
+				self.hills.add_at(location)
+				self.vehicle.draw(self.vehicle.sloc_rect)
 				return
 				
 			else:
@@ -140,23 +151,42 @@ class SimMap:
 	
     # menu_load def of class SimMap
 	# Desc: load the map from a file
-	# Parm: filename - name of file to read from
-	def menu_load(self, filename):
+	#	The AI weights are memory mapped from the weights file, the
+	#	hills on the map are replaced by those of the hills file.
+	# Parm: filename - name of file to read from, default is the 
+	#	"weights file" of the config
+	def menu_load(self, filename=None):
+		if filename == None :
+			filename = self.weights_file
 		if TEST: print('load from {}'.format(filename))
 		self.running = False
+		if os.path.exists(filename) :
+			self.AI.load(filename)
+		else :
+			print('No saved weights in {}'.format(filename))
+		if os.path.exists(self.hills_file) :
+			self.hills.load(self.hills_file)
+			# the vehicle may be under a hill that was put back
+			self.vehicle.draw(self.vehicle.sloc_rect)
+		else :
+			print('No saved hills in {}'.format(self.hills_file))
 
     # menu_save def of class SimMap
 	# Desc: user request to save the map and sprites to a file 
+	#	The AI weights go to the "weights file" of the config, the hill
+	#	layout to the "hills file", see sensorlut.
 	def menu_save(self) :
-		if TEST: print('save to file to be implemented')
+		if TEST: print('save weights to {}'.format(self.weights_file))
 		self.running = False
+		self.AI.save(self.weights_file)
+		self.hills.save(self.hills_file)
 
 	# menu_manual def of class SimMap
 	# Desc: set mode to manual, vehicle driven by keyboard
 	def menu_manual(self):
 		if TEST: print( 'manual')
 		self.running = False
-		self.driveMode = 'manual'
+		self.sim.drive_mode = 'manual'
 		self.menu.update_menu(2, 'AI')
 		self.menu.update_menu(4, 'Run')
 
@@ -165,45 +195,33 @@ class SimMap:
 	def menu_ai(self):
 		if TEST: print( 'ai')
 		self.running = False
-		self.driveMode = 'ai'
+		self.sim.drive_mode = 'ai'
 		self.menu.update_menu(2, 'Manual')
 		self.menu.update_menu(4, 'Run')
 		self.step = True
 	
 	# menu_step def of class SimMap
 	# Desc: step or run button: advance the vehicle one step
-	#	Either a manual step or, if AI is active, an AI step 
-	# Parm: mode "manual" or "AI"
+	#	Either a manual step or, if AI is active, an AI step, see
+	#	simcore.Sim.step. The Vehicle draws itself as it moves.
 	# Return: True to move vehicle and run again, False at optimal result
 	# Called by: AILab user 'step' or 'run' event
 	def menu_step(self):
-		# new input set, normalize magnitudes
-		if self.drive_mode == 'manual' :
-			vehicle_command = self.vehicle.user_vector( self, 'space' )
-			# update the display
-			self.vehicle.move(vehicle_command)
-			return True
-
-		sensor_data = self.sensors.get_sensor_data( self.hills.hillslist )
-		sensor_data = self.normalize_complex_set(sensor_data)
-
-		# get reference signal received as if at the exit (0 angle, full power)
-		target_value = self.sensors.get_expected_result()
-		mag,angle = cmath.polar(target_value)
-	
-		# normalize target magnitude to 1
-		target_result = complex(1,angle)
-		print('Normalized target value is {}'.format(target_result))
-	
-		# compute a change of direction and speed for the vehicle (complex)
-		vehicle_command = self.AI.adapt(sensor_data, target_result, True)
-		if vehicle_command == -1 : # AI is at the optimal result
-			return False	
-			
-		# update the display
-		self.vehicle.move(vehicle_command)
-		return True
+		return self.sim.step()
 	
+	# menu_run def of class SimMap
+	# Desc: start running, change menu item 4 from 'Run' to 'Stop'
+	def menu_run(self):
+		if TEST: print( 'run')
+		self.menu.update_menu(4, 'Stop')
+
+	# menu_turbo def of class SimMap
+	# Desc: show the pace, menu item 5 offers the other one
+	# Parm: turbo - True if now in turbo, see render.FrameClock
+	def menu_turbo(self, turbo):
+		if TEST: print( 'turbo', turbo)
+		self.menu.update_menu(5, 'Normal' if turbo else 'Turbo')
+
 	# menu_stop def of class SimMap
 	# Desc: stop running, change menu item 4 from 'Stop' to 'Run'
 	#    can be running in AI mode or manual mode
@@ -222,25 +240,6 @@ class SimMap:
 	def menu_exit(self):
 		if TEST: print('exit')	
 
-	# normalize_complex_set def of class NeuralNetCmplx
-	# Desc: get largest magnitude, use to normalize magnitudes
-	# Parm: set - a list of complex values
-	# Return: normalized list of complex values
-	def normalize_complex_set( self, set ):
-		max = 0
-		size = len(set)
-		for index in range(size):
-			value = set[index]
-			mag, angle = cmath.polar(set[index])
-			if mag > max : max = mag
-		if TEST: print('Normalized')
-		for index in range(size):
-			mag, angle = cmath.polar(set[index])
-			mag = mag / max
-			set[index] = complex(mag, angle)
-			print(self.trun_comp(set[index] ) )
-		return set
-		
 	# def trun_comp
 	# Desc: convert complex into truncated and rounded values
 	# Return: real, imag
@@ -257,10 +256,12 @@ class Menu:
 	# Parm: screen - area of display reserved for this map
 	# Parm: menu_height - number of pixels of menu height above map
 	# Parm: map_color - color of map background
-	def __init__(self, screen, menu_height, map_color):
+	# Parm: dirty - render.DirtyRects, collects what the menu draws
+	def __init__(self, screen, menu_height, map_color, dirty):
 
 		self.screen = screen
-		self.button_text = ["Load", "Save", "Manual", "Step", "Run", "Help", "Exit"]
+		self.dirty = dirty
+		self.button_text = ["Load", "Save", "Manual", "Step", "Run", "Turbo", "Help", "Exit"]
 		self.button_count =  len(self.button_text)
 		self.buttons = []
 		self.menu_height = menu_height
@@ -278,11 +279,12 @@ class Menu:
 			'background' : SAND,
 			'button' : WHITE
 			}
-		self.draw_menu()
+		self.build_menu()
 
-	# draw_menu def of class Menu
-	# Desc: Draws the menu of buttons at the top of the screen
-	def draw_menu(self):
+	# build_menu def of class Menu
+	# Desc: make the buttons, once. A Button draws itself when made.
+	# Usage: __init__
+	def build_menu(self):
 		for index in range(self.button_count):
 			x = self.button_width * index
 			# Parms: (text, screen, x, y, w, h, border_size, color, hover_color ):
@@ -292,122 +294,130 @@ class Menu:
 				self.colors['button']
 				)
 			self.buttons.append(aButton)
-		pygame.display.update()
+		self.dirty.add((0, 0, self.screen.get_width(), self.button_height))
 
 	# check_menu def of class Menu
 	# Desc: An event was detected, check for menu events. 
 	# Desc: Changes color if hovering on a button.
 	# Parm: action - MOUSEMOTION, MOUSEBUTTONUP, MOUSEBUTTONDOWN
-	# Return: Text for the selected menu item, else 'scene'
+	# Return: Text for the selected menu item, else 'scene'. On button
+	#	up None if a pressed button is released.
 	# Usage: main
 	def check_menu( self, event ):
 		x,y = event.pos
-		ret = None
+		ret = 'scene'
 		for button in self.buttons :
 			if event.type == pygame.MOUSEBUTTONDOWN :
 				text = button.check_down(x, y)
 				if text != None :
+					self.dirty.add(button.rect)
 					return text
-			if event.type == pygame.MOUSEBUTTONUP :
-				return button.check_up(x, y)
-		return 'scene' # not on a menu button
+			# release every pressed button, the mouse may have moved off it
+			elif event.type == pygame.MOUSEBUTTONUP and button.border_width != 0 :
+				self.dirty.add(button.draw(0))
+				ret = None
+		return ret # not on a menu button
                                
 	# update_menu def of class Menu
-	# Desc: change test of a menu button
+	# Desc: change text of a menu button, only that button is redrawn
 	# Parm: index - index of button to change, 0-n
 	# Parm: text - new text
 	# Usage: main
 	def update_menu( self, index, text ):
 		self.button_text[index] = text
-		self.buttons[index].set_text( text )
-		self.draw_menu( )
+		self.dirty.add(self.buttons[index].set_text( text ))
 	
 # Hills class of module desertmap
-# Desc: support a list of hills
+# Desc: support a list of hills. Hills are drawn on the background from
+#	the hill tile of the assets atlas, several in one blits call, then
+#	that part of the background is copied to the screen.
 # Usage: created by class SimMap
-class Hills(pygame.sprite.Sprite):
+class Hills(simcore.HillStore):
 
 	# __init__ def of classs Hills
 	# Desc: define a list for hills. Support actions on hills.
-	# Parm: screen - screen surface where the hills are displayed
-	def __init__(self, screen, screen_height):
-		self.screen = screen
+	# Parm: background - render.Background where the hills are drawn
+	# Parm: screen_height - screen y of the bottom of the map, map y 0
+	def __init__(self, background, screen_height):
+		simcore.HillStore.__init__(self, SIZE)
+		self.background = background
 		self.screen_height = screen_height
-		# get a sprite based on the image
-		self.hillImage, self.hillRect = self.load_png("hill.png")
-		# get a background sprite based on the grass image
-		self.sand_bgn, self.rectangle = self.load_png("sand.png")
-		# list of all hills
-		self.hillslist = []    
+		# the 20x20 hill sprite is a tile of the atlas
+		self.atlas = assets.atlas()
+		# False while load adds many hills, they are drawn together
+		self.drawing = True
 		
+	# tiles def of class Hills
+	# Desc: atlas tiles of hills, each centred on its hill
+	# Parm: hill_ids - indexes into hillslist
+	# Return: list of (tile name, screen x, y of the top left corner)
+	def tiles(self, hill_ids):
+		return [("hill.png", (self.hillslist[hill_id].x - SIZE, self.screen_height - self.hillslist[hill_id].y - SIZE))
+			for hill_id in hill_ids]
+
 	# add def of class Hills
-	# Desc: add a hill to the list. Convert y coord to go up, not down
+	# Desc: add a hill to the list and draw it, see HillStore.add
+	# Parm: x, y - map coords, y up
+	# Return: index of the hill in hillslist
+	# Usage: add_at, SimMap.new_frame, HillStore.load
+	def add(self, x, y):
+		hill_id = simcore.HillStore.add(self, x, y)
+		if self.drawing :
+			# paint the image around the hill location
+			self.background.restore(self.background.draw_tiles(self.atlas, self.tiles([hill_id]))[0])
+		return hill_id
+
+	# load def of class Hills
+	# Desc: replace the hills with those of a file, see HillStore.load,
+	#	then draw them all at once
+	# Parm: filename - .npy file
+	# Usage: SimMap.menu_load
+	def load(self, filename):
+		self.drawing = False
+		simcore.HillStore.load(self, filename)
+		self.drawing = True
+		self.redraw()
+
+	# redraw def of class Hills
+	# Desc: bare terrain, then every hill in use in one blits call
+	def redraw(self):
+		hill_x, hill_y, in_use = self.arrays()
+		self.background.clear(self.background.area)
+		self.background.draw_tiles(self.atlas, self.tiles(
+			[hill_id for hill_id, used in enumerate(in_use.tolist()) if used]))
+		self.background.restore(self.background.area)
+
+	# add_at def of class Hills
+	# Desc: add a hill where the mouse is. Convert y coord to go up, not down
 	# Parm: location in form [x,y] screen pixel coords, center of a cell
 	#		where a cell contains a vehicle or hill
+	# Return: index of the hill in hillslist
 	# Usage: mouse_button
-	def add(self, location):
-		x = location[0]
+	def add_at(self, location):
 		# Convert y coord to go up, not down, so 0 is at the bottom
-		y =  self.screen_height - location[1]
-		# walk the list looking for a free hill in cell around x,y
-		for hill in self.hillslist :
-			# SIZE is height of a cell in pixels.
-			# SIZE is a global set to 10
-			# So a cell is 20 x 20 pixels
-			if x < hill.x and x > hill.x \
-			and y > hill.y - SIZE and y < hill.y + SIZE : # SIZE is # pixels in a cell
-				if hill.state == 'free' :
-					self.screen.blit(self.hillImage, (hill.x - SIZE, hill.y - SIZE))
-					hill.state = 'inUse'
-					return
-
-		# no hill at this location so add a hill object	
-		hill = self.Hill(x,y)
-		self.hillslist.append(hill)
-		# paint the image around the location coordinates
-		self.screen.blit(self.hillImage, (location[0] - SIZE, location[1] - SIZE))
+		return self.add(location[0], self.screen_height - location[1])
 
-	# remove def of class Hills
-	# Desc: delete a hill from display and list
-	# Parm: location - x,y anywhere in a SIZE x SIZE box
-	def remove(self, location) :
-		x = location[0]
-		y = location[1]
-		# walk the list looking for a free hill at x,y, replace with sand
-		for hill in self.hillslist :
-			if x > hill.x - SIZE and x < hill.x + SIZE \
-				and y > hill.y and  y < hill.y + SIZE:
-				# x,y are in this hill box
-				if hill.state == 'inUse' :
-					hill.state = 'free'
-					self.screen.blit(self.sand_bgn, (hill.x - SIZE, hill.y - SIZE))
-					return
-		
-	# load_pgn def of class Hills
-	# Desc: load a .png picture
-	# Parm: name - file name, local directory only
-	def load_png(self, name):
-		try:
-			image = pygame.image.load(name)  # in local directory
-			if image.get_alpha is None:
-				image = image.convert()
-			else:
-				image = image.convert_alpha()
-		except (pygame.error, message):
-			print('Cannot load image:',image)
-			return None, None
-		return image, image.get_rect()
-
-	# Hills inner class of class Hills
-	# Desc: defines a hill object. Sets state to inUse.
-	# Note: a hill cannot be printed - it contains a sprite
-	class Hill( pygame.sprite.Sprite ):
-		# __init__ def of classs Hill
-		# Desc: create a hill with state 'inUse' 
-		def __init__(self, x, y):
-			self.x = x
-			self.y = y
-			self.sprite = pygame.sprite.Sprite
-			self.state = 'inUse'
-	
+	# remove_at def of class Hills
+	# Desc: delete the hill where the mouse is
+	# Parm: location - x,y screen coords anywhere in a SIZE x SIZE box
+	# Return: index of the hill in hillslist, None if no hill is there
+	# Usage: mouse_button
+	def remove_at(self, location) :
+		return self.remove(location[0], self.screen_height - location[1])
 
+	# remove def of class Hills
+	# Desc: delete a hill from display and list, see HillStore.remove
+	# Parm: x, y - map coords, y up, anywhere in the hill box
+	# Return: index of the hill in hillslist, None if no hill is there
+	def remove(self, x, y) :
+		hill_id = simcore.HillStore.remove(self, x, y)
+		if hill_id != None and self.drawing :
+			# replace with sand, then put back the hills that overlap it
+			hill = self.hillslist[hill_id]
+			rect = pygame.Rect(hill.x - SIZE, self.screen_height - hill.y - SIZE, 2 * SIZE, 2 * SIZE)
+			self.background.clear(rect)
+			reach = 2 * SIZE
+			self.background.draw_tiles(self.atlas, self.tiles(
+				self.index.box(hill.x - reach, hill.y - reach, hill.x + reach, hill.y + reach)))
+			self.background.restore(rect)
+		return hill_id
@@ -0,0 +1,243 @@
+# Module: optimizers.py
+# Desc: weight update rules and learning rate schedules for NeuralNetCmplx.
+#	Works for complex weights: the second moment of a gradient is its
+#	squared magnitude, |g|^2, so step sizes stay real.
+#	Each weight array has its own state, a dictionary of arrays the
+#	same shape as the weights, made by new_state().
+#	The split backend keeps a complex weight as a real and an imaginary
+#	array. update_split() steps the pair as one complex weight, one
+#	|g|^2 for both parts, so both backends run the same rule. Its state
+#	is made by new_split_state().
+#
+#	Config, all keys optional:
+#	"optimizer" :
+#		{
+#		"type" : "adam",		sgd, momentum, nesterov, adam or rmsprop
+#		"momentum" : 0.9,		momentum and nesterov
+#		"beta1" : 0.9,			adam
+#		"beta2" : 0.999,		adam
+#		"rho" : 0.9,			rmsprop
+#		"eps" : 1e-8			adam and rmsprop
+#		},
+#	"schedule" :
+#		{
+#		"type" : "cosine",		constant, step or cosine
+#		"step size" : 1000,		step: steps between rate drops
+#		"gamma" : 0.5,			step: rate multiplier at each drop
+#		"period" : 10000,		cosine: steps from full rate to min rate
+#		"min rate" : 0.0,		cosine: rate at the end of the period
+#		"warmup" : 100			any: steps of linear ramp up from 0
+#		}
+#	The base rate is "learning rate" of the config.
+#
+# Author: Brad Denniston
+# Version: 0.1, 18 Oct 2026
+
+import math
+import sys
+import numpy as np
+
+# CLASS: Schedule of module optimizers
+# Desc: learning rate as a function of the step count
+class Schedule :
+	# DEF: __init__ of class Schedule
+	# Parm: base_rate - learning rate at full strength
+	# Parm: schedule_dict - "schedule" dictionary of the config
+	def __init__(self, base_rate, schedule_dict) :
+		self.base_rate = base_rate
+		self.type = schedule_dict.get('type', 'constant')
+		self.step_size = schedule_dict.get('step size', 1000)
+		self.gamma = schedule_dict.get('gamma', 0.5)
+		self.period = schedule_dict.get('period', 10000)
+		self.min_rate = schedule_dict.get('min rate', 0.0)
+		self.warmup = schedule_dict.get('warmup', 0)
+		if self.type not in ('constant', 'step', 'cosine') :
+			print('Error: unknown schedule {}'.format(self.type))
+			sys.exit(1)
+
+	# DEF: rate of class Schedule
+	# Parm: count - number of the step, starts at 1
+	# Return: learning rate for this step
+	def rate(self, count) :
+		if self.type == 'step' :
+			rate = self.base_rate * self.gamma ** (count // self.step_size)
+		elif self.type == 'cosine' :
+			phase = min(count, self.period) / self.period
+			rate = self.min_rate + (self.base_rate - self.min_rate) \
+				* 0.5 * (1 + math.cos(math.pi * phase))
+		else :
+			rate = self.base_rate
+		if count < self.warmup :
+			rate = rate * count / self.warmup
+		return rate
+
+# CLASS: Optimizer of module optimizers
+# Desc: plain gradient descent, param -= rate * grad.
+#	The other optimizers change update() and new_state().
+# Usage: NeuralNetCmplx owns one, each Layer keeps the state of its weights
+class Optimizer :
+	# DEF: __init__ of class Optimizer
+	# Parm: schedule - a Schedule
+	# Parm: opt_dict - "optimizer" dictionary of the config
+	def __init__(self, schedule, opt_dict) :
+		self.schedule = schedule
+		self.count = 0
+		self.rate = schedule.rate(1)
+
+	# DEF: tick of class Optimizer
+	# Desc: start the next step, updates the learning rate
+	# Usage: NeuralNetCmplx.step, once before the layer updates
+	def tick(self) :
+		self.count += 1
+		self.rate = self.schedule.rate(self.count)
+
+	# DEF: new_state of class Optimizer
+	# Parm: param - weight array the state belongs to
+	# Return: dictionary of state arrays
+	def new_state(self, param) :
+		return dict()
+
+	# DEF: update of class Optimizer
+	# Desc: change param in place
+	# Parm: param - weight array
+	# Parm: grad - gradient of the error, same shape as param
+	# Parm: state - from new_state(param)
+	def update(self, param, grad, state) :
+		param -= self.rate * grad
+
+	# DEF: new_split_state of class Optimizer
+	# Parm: param - real part of the weight array the state belongs to
+	# Return: state for update_split, here a state for each part
+	def new_split_state(self, param) :
+		return (self.new_state(param), self.new_state(param))
+
+	# DEF: update_split of class Optimizer
+	# Desc: change a complex weight kept as real and imaginary parts in
+	#	place. A rule that is the same for every element steps each
+	#	part on its own.
+	# Parm: param_re, param_im - real and imaginary weight arrays
+	# Parm: grad_re, grad_im - real and imaginary parts of the gradient
+	# Parm: state - from new_split_state(param_re)
+	def update_split(self, param_re, param_im, grad_re, grad_im, state) :
+		self.update(param_re, grad_re, state[0])
+		self.update(param_im, grad_im, state[1])
+
+# CLASS: Momentum of module optimizers
+# Desc: heavy ball momentum, velocity = momentum * velocity + grad
+class Momentum(Optimizer) :
+	def __init__(self, schedule, opt_dict) :
+		Optimizer.__init__(self, schedule, opt_dict)
+		self.momentum = opt_dict.get('momentum', 0.9)
+
+	def new_state(self, param) :
+		return {'velocity' : np.zeros(param.shape, dtype=param.dtype)}
+
+	def update(self, param, grad, state) :
+		velocity = state['velocity']
+		velocity *= self.momentum
+		velocity += grad
+		param -= self.rate * velocity
+
+# CLASS: Nesterov of module optimizers
+# Desc: momentum that steps with the look ahead gradient,
+#	grad + momentum * new velocity
+class Nesterov(Momentum) :
+	def update(self, param, grad, state) :
+		velocity = state['velocity']
+		velocity *= self.momentum
+		velocity += grad
+		param -= self.rate * (grad + self.momentum * velocity)
+
+# CLASS: RMSProp of module optimizers
+# Desc: scale each weight step by the running mean of |grad|^2
+class RMSProp(Optimizer) :
+	def __init__(self, schedule, opt_dict) :
+		Optimizer.__init__(self, schedule, opt_dict)
+		self.rho = opt_dict.get('rho', 0.9)
+		self.eps = opt_dict.get('eps', 1e-8)
+
+	def new_state(self, param) :
+		return {'square' : np.zeros(param.shape)}
+
+	def update(self, param, grad, state) :
+		square = state['square']
+		square *= self.rho
+		square += (1 - self.rho) * (grad.real ** 2 + grad.imag ** 2)
+		param -= self.rate * grad / (np.sqrt(square) + self.eps)
+
+	# one |grad|^2 for both parts
+	def new_split_state(self, param) :
+		return {'square' : np.zeros(param.shape)}
+
+	def update_split(self, param_re, param_im, grad_re, grad_im, state) :
+		square = state['square']
+		square *= self.rho
+		square += (1 - self.rho) * (grad_re ** 2 + grad_im ** 2)
+		scale = self.rate / (np.sqrt(square) + self.eps)
+		param_re -= scale * grad_re
+		param_im -= scale * grad_im
+
+# CLASS: Adam of module optimizers
+# Desc: bias corrected running means of grad and |grad|^2
+class Adam(Optimizer) :
+	def __init__(self, schedule, opt_dict) :
+		Optimizer.__init__(self, schedule, opt_dict)
+		self.beta1 = opt_dict.get('beta1', 0.9)
+		self.beta2 = opt_dict.get('beta2', 0.999)
+		self.eps = opt_dict.get('eps', 1e-8)
+
+	def new_state(self, param) :
+		return {'mean' : np.zeros(param.shape, dtype=param.dtype),
+			'square' : np.zeros(param.shape)}
+
+	def update(self, param, grad, state) :
+		mean = state['mean']
+		square = state['square']
+		mean *= self.beta1
+		mean += (1 - self.beta1) * grad
+		square *= self.beta2
+		square += (1 - self.beta2) * (grad.real ** 2 + grad.imag ** 2)
+		count = max(self.count, 1)
+		mean_hat = mean / (1 - self.beta1 ** count)
+		square_hat = square / (1 - self.beta2 ** count)
+		param -= self.rate * mean_hat / (np.sqrt(square_hat) + self.eps)
+
+	# a mean for each part, one |grad|^2 for both
+	def new_split_state(self, param) :
+		return {'mean' : (np.zeros(param.shape, dtype=param.dtype),
+			np.zeros(param.shape, dtype=param.dtype)),
+			'square' : np.zeros(param.shape)}
+
+	def update_split(self, param_re, param_im, grad_re, grad_im, state) :
+		square = state['square']
+		square *= self.beta2
+		square += (1 - self.beta2) * (grad_re ** 2 + grad_im ** 2)
+		count = max(self.count, 1)
+		scale = self.rate / (1 - self.beta1 ** count) \
+			/ (np.sqrt(square / (1 - self.beta2 ** count)) + self.eps)
+		for param, grad, mean in zip((param_re, param_im), (grad_re, grad_im), state['mean']) :
+			mean *= self.beta1
+			mean += (1 - self.beta1) * grad
+			param -= scale * mean
+
+OPTIMIZERS = {
+	'sgd' : Optimizer,
+	'momentum' : Momentum,
+	'nesterov' : Nesterov,
+	'rmsprop' : RMSProp,
+	'adam' : Adam,
+	}
+
+# DEF: make_optimizer of module optimizers
+# Desc: build the optimizer and schedule selected in the config
+# Parm: config - dictionary of configuration data
+# Return: an Optimizer
+# Usage: NeuralNetCmplx.__init__
+def make_optimizer(config) :
+	opt_dict = config.get('optimizer', dict())
+	opt_type = opt_dict.get('type', 'sgd')
+	if opt_type not in OPTIMIZERS :
+		print('Error: unknown optimizer {}'.format(opt_type))
+		sys.exit(1)
+	schedule = Schedule(config['learning rate'], config.get('schedule', dict()))
+	return OPTIMIZERS[opt_type](schedule, opt_dict)
@@ -0,0 +1,208 @@
+# Module: render.py
+# Desc: push only the changed parts of the screen to the display.
+#	Whatever draws on the screen (vehicle, hills, menu) adds the
+#	rectangle it drew to a DirtyRects. Once a frame AILab calls
+#	update, which hands just those rectangles to pygame.display.update.
+#	A frame where nothing moved costs nothing, a moving vehicle costs
+#	two 20 x 20 rectangles whatever the size of the map.
+#		self.dirty.add(self.screen.blit(image, location))
+#	Something that redraws the whole screen calls add_all.
+#	Background keeps the terrain and hills on a surface of their own so
+#	a moving sprite is erased by copying back what was under it.
+#	FrameClock decides how many simulation steps a frame takes and
+#	which frames are drawn.
+#
+# Author: Brad Denniston
+# Version: 0.1, 18 Oct 2026
+
+import pygame
+
+# CLASS: DirtyRects of module render
+# Desc: the rectangles of the screen changed since the last update
+# Usage: desertmap.SimMap makes one, AILab updates it once a frame
+class DirtyRects :
+	# DEF: __init__ of class DirtyRects
+	# Parm: screen - the display surface
+	def __init__(self, screen) :
+		self.screen = screen
+		self.bounds = screen.get_rect()
+		self.rects = []
+		self.full = True	# nothing is on the display yet
+
+	# DEF: add of class DirtyRects
+	# Desc: mark a rectangle as changed. A rectangle already marked is
+	#	dropped, one that overlaps the last one, as when a sprite moves
+	#	a pixel or two, grows that one.
+	# Parm: rect - pygame.Rect or (x, y, w, h), as blit returns
+	def add(self, rect) :
+		rect = self.bounds.clip(pygame.Rect(rect))
+		if rect.width == 0 or rect.height == 0 or self.full :
+			return
+		for marked in self.rects :
+			if marked.contains(rect) :
+				return
+		if self.rects and self.rects[-1].colliderect(rect) :
+			self.rects[-1].union_ip(rect)
+		else :
+			self.rects.append(rect)
+
+	# DEF: add_all of class DirtyRects
+	# Desc: mark the whole screen as changed
+	def add_all(self) :
+		self.full = True
+		self.rects = []
+
+	# DEF: update of class DirtyRects
+	# Desc: push the changed rectangles to the display and forget them
+	# Return: number of rectangles pushed, 0 if nothing changed
+	# Usage: AILab, once a frame
+	def update(self) :
+		if self.full :
+			pygame.display.update()
+			count = 1
+		elif self.rects :
+			pygame.display.update(self.rects)
+			count = len(self.rects)
+		else :
+			count = 0
+		self.full = False
+		self.rects = []
+		return count
+
+# CLASS: Background of module render
+# Desc: the terrain and the hills, drawn once on a surface of their own.
+#	Hills draw here when they change, not on the screen. A sprite is
+#	erased by copying the background back over where it was, so it
+#	never wipes a hill it passed over. Only the map area is restored,
+#	the menu is drawn straight on the screen.
+# Usage: desertmap.SimMap makes one, Hills and Vehicle draw with it
+class Background :
+	# DEF: __init__ of class Background
+	# Parm: screen - the display surface
+	# Parm: area - (x, y, w, h) of the map on screen
+	# Parm: color - color of the bare terrain
+	# Parm: dirty - DirtyRects, marks what restore changes
+	def __init__(self, screen, area, color, dirty) :
+		self.screen = screen
+		self.area = pygame.Rect(area)
+		self.color = color
+		self.dirty = dirty
+		self.surface = pygame.Surface(screen.get_size()).convert()
+		self.surface.fill(color)
+
+	# DEF: clear of class Background
+	# Desc: back to bare terrain
+	# Parm: rect - pygame.Rect or (x, y, w, h)
+	def clear(self, rect) :
+		self.surface.fill(self.color, rect)
+
+	# DEF: draw_tiles of class Background
+	# Desc: draw atlas tiles on the background, not yet on the screen
+	# Parm: atlas - assets.Atlas
+	# Parm: tiles - sequence of (name, location), location is x, y of
+	#	the top left corner
+	# Return: list of the rects drawn
+	def draw_tiles(self, atlas, tiles) :
+		return atlas.blits(self.surface, tiles)
+
+	# DEF: restore of class Background
+	# Desc: copy the background to the screen, erases sprites there
+	# Parm: rect - pygame.Rect or (x, y, w, h)
+	# Return: the screen rect drawn
+	def restore(self, rect) :
+		rect = self.area.clip(pygame.Rect(rect))
+		drawn = self.screen.blit(self.surface, rect, rect)
+		self.dirty.add(drawn)
+		return drawn
+
+# CLASS: FrameClock of module render
+# Desc: paces the main loop, simulation steps apart from drawn frames.
+#	Normal - frames at "fps". Steps come from a fixed time step
+#		accumulator at "steps per second", so the sim rate does not
+#		depend on the frame rate. At most "max steps per frame" are
+#		taken in a frame, time beyond that is dropped.
+#	Turbo - no frame cap, "turbo steps per frame" steps each frame and
+#		only every "turbo render every"th frame is drawn and pushed to
+#		the display. A frame with no steps, the sim stopped, waits for
+#		the next frame as normal does.
+#	Config, all keys optional:
+#	"display" :
+#		{
+#		"fps" : 30,
+#		"steps per second" : 5,
+#		"max steps per frame" : 50,
+#		"turbo" : false,
+#		"turbo steps per frame" : 20,
+#		"turbo render every" : 10
+#		}
+# Usage: AILab
+class FrameClock :
+	# DEF: __init__ of class FrameClock
+	# Parm: config - dictionary of configuration data
+	def __init__(self, config) :
+		display = config.get('display', dict())
+		self.fps = display.get('fps', 5)
+		self.step_rate = display.get('steps per second', self.fps)
+		self.max_steps = display.get('max steps per frame', 50)
+		self.turbo = display.get('turbo', False)
+		self.turbo_steps = display.get('turbo steps per frame', 20)
+		self.render_every = display.get('turbo render every', 10)
+		self.clock = pygame.time.Clock()
+		self.accumulator = 0.0		# seconds of sim time not yet stepped
+		self.frame = 0
+		self.stepped = 0			# steps taken this frame
+
+	# DEF: steps of class FrameClock
+	# Desc: how many sim steps to take this frame
+	# Parm: running - False when the sim is stopped, time is not saved up
+	# Return: number of steps
+	def steps(self, running) :
+		if not running :
+			self.accumulator = 0.0
+			count = 0
+		elif self.turbo :
+			count = self.turbo_steps
+		else :
+			self.accumulator += self.clock.get_time() / 1000.0
+			count = min(int(self.accumulator * self.step_rate), self.max_steps)
+			self.accumulator = min(self.accumulator - count / self.step_rate, 1.0 / self.step_rate)
+		self.stepped = count
+		return count
+
+	# DEF: render of class FrameClock
+	# Desc: should this frame be drawn and pushed to the display
+	# Return: True or False
+	def render(self) :
+		return not self.turbo or self.frame % self.render_every == 0
+
+	# DEF: tick of class FrameClock
+	# Desc: end the frame, wait for the next one unless in turbo with
+	#	steps taken. A stopped sim in turbo does not spin a core.
+	def tick(self) :
+		self.frame += 1
+		if self.turbo and self.stepped :
+			self.clock.tick()
+		else :
+			self.clock.tick(self.fps)
+
+	# DEF: faster of class FrameClock
+	# Desc: double the sim rate, steps per second or turbo steps
+	def faster(self) :
+		if self.turbo :
+			self.turbo_steps *= 2
+		else :
+			self.step_rate *= 2
+
+	# DEF: slower of class FrameClock
+	# Desc: halve the sim rate, not below 1
+	def slower(self) :
+		if self.turbo :
+			self.turbo_steps = max(1, self.turbo_steps // 2)
+		else :
+			self.step_rate = max(1, self.step_rate / 2)
+
+	# DEF: set_turbo of class FrameClock
+	# Parm: turbo - True for turbo, False for normal
+	def set_turbo(self, turbo) :
+		self.turbo = turbo
+		self.accumulator = 0.0
@@ -0,0 +1,121 @@
+# Module: sensorlut.py
+# Desc: build the sensor lookup table for a fixed hill layout.
+#	For fixed hills the radar sum of the hills is a function of the
+#	vehicle pose only, x, y and heading. The table holds it on a grid
+#	of poses, every "lut step" pixels over "lut size" and "lut headings"
+#	headings around the circle. Sensors in mode lut reads it back and
+#	interpolates, see sensors.load_table.
+#	The exit signal is not in the table, it jumps where the exit is
+#	straight above or below the vehicle and is cheap, so Sensors still
+#	computes it.
+#	The table is a .npy file of complex64, shape (x, y, heading, sensor),
+#	read with a memory map. Its grid is in a JSON sidecar, file + ".json",
+#	with the sensors and the HillStore.layout_hash of the hills it holds.
+#	Rows of x are built in a process pool, each worker writes its rows
+#	straight into the memory map.
+#
+#	Usage: python sensorlut.py [config file]
+#	The hill layout is the "hills file" of the config, written by the
+#	Save menu. The table goes to the "lut file" of "sensors".
+#
+# Author: Brad Denniston
+# Version: 0.1, 18 Oct 2026
+
+import concurrent.futures
+import json
+import sys
+import time
+import numpy as np
+
+import sensors
+import simcore
+
+# state of a worker process, set by init_worker
+_worker = dict()
+
+# DEF: build of module sensorlut
+# Desc: compute the table and write it and its sidecar
+# Parm: config - dictionary of configuration data
+# Parm: workers - number of processes, None for one per cpu
+# Return: name of the table file
+def build(config, workers=None) :
+	sensor_dict = config['sensors']
+	lut_file = sensor_dict.get('lut file', 'ailab1-sensors.npy')
+	hills_file = config.get('hills file', 'ailab1-hills.npy')
+	step = sensor_dict.get('lut step', 5)
+	headings = sensor_dict.get('lut headings', 72)
+	size_x, size_y = sensor_dict.get('lut size', [400, 400])
+	angles = [float(angle) for angle in sensor_dict['angles'][:sensor_dict['count']]]
+
+	store = simcore.HillStore()
+	store.load(hills_file)
+	hill_x, hill_y, in_use = store.arrays()
+	# the exit is the first hill, it is not in the table
+	hill_x, hill_y = hill_x[1:], hill_y[1:]
+	header = {
+		'x0' : 0.0,
+		'y0' : 0.0,
+		'step' : step,
+		'nx' : int(size_x // step) + 1,
+		'ny' : int(size_y // step) + 1,
+		'headings' : headings,
+		'angles' : angles,
+		'max range' : sensor_dict.get('max range', 0),
+		'hills' : len(hill_x),
+		'map size' : [simcore.MAP_WIDTH, simcore.MAP_HEIGHT],
+		'layout' : store.layout_hash(),
+		}
+
+	table = np.lib.format.open_memmap(lut_file, mode='w+', dtype=np.complex64,
+		shape=(header['nx'], header['ny'], headings, len(angles)))
+	del table
+	start = time.perf_counter()
+	with concurrent.futures.ProcessPoolExecutor(max_workers=workers,
+		initializer=init_worker, initargs=(lut_file, header, hill_x, hill_y)) as pool :
+		for row in pool.map(build_row, range(header['nx'])) :
+			pass
+	with open(lut_file + '.json', 'w') as sidecar :
+		json.dump(header, sidecar, indent=1)
+	print('sensor table {} x {} x {} in {:.1f} s to {}'.format(header['nx'], header['ny'],
+		headings, time.perf_counter() - start, lut_file))
+	return lut_file
+
+# DEF: init_worker of module sensorlut
+# Desc: keep what every row needs in the worker process
+# Usage: build, by the process pool
+def init_worker(lut_file, header, hill_x, hill_y) :
+	_worker['table'] = np.load(lut_file, mmap_mode='r+')
+	_worker['header'] = header
+	_worker['hills'] = hill_x + 1j * hill_y
+
+# DEF: build_row of module sensorlut
+# Desc: radar sums for every y and heading at one x
+# Parm: row - index of x in the table
+# Return: row
+# Usage: build, by the process pool
+def build_row(row) :
+	table = _worker['table']
+	header = _worker['header']
+	hills = _worker['hills']
+	heading_deg = np.arange(header['headings']) * 360.0 / header['headings']
+	# unit vector along each sensor at each heading, rows are headings
+	directions = np.exp(1j * np.radians(heading_deg[:, None] + np.array(header['angles'])[None, :]))
+	directions = directions.reshape(-1)
+	# do several headings at once, but keep the work arrays small
+	chunk = max(1, 4000000 // max(len(hills), 1))
+	x = header['x0'] + row * header['step']
+	for column in range(header['ny']) :
+		y = header['y0'] + column * header['step']
+		distance, bearing = sensors.hill_bearings(hills - complex(x, y))
+		sums = np.empty(len(directions), dtype=complex)
+		for first in range(0, len(directions), chunk) :
+			sensor_to_hill = directions[first:first + chunk, None] * bearing[None, :]
+			sums[first:first + chunk] = sensors.radar_sum(sensor_to_hill, distance, header['max range'])
+		table[row, column] = sums.reshape(header['headings'], -1)
+	table.flush()
+	return row
+
+if __name__ == '__main__' :
+	config_name = sys.argv[1] if len(sys.argv) > 1 else 'config-ailab1.jsn'
+	with open(config_name) as config_file :
+		build(json.load(config_file))
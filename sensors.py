@@ -7,11 +7,14 @@
 # Author: Brad Denniston
 # Version: 0.3, 9 Feb 2019 
 
-# import python game module
-import pygame
 import cmath
-import tools
+import json
+import sys
+import numpy as np
+import spatial
+import tracer
 TEST = False
+_trace = tracer.channel('sensors')
 
 # Sensors class of module sensors
 # Desc: Sensors detect the environment, pass results to the AI.
@@ -44,7 +47,42 @@ class Sensors :
 		for sens in range(self.num_sensors):
 			self.sensor_angles_deg.append(float(sensor_angles[sens]))
 			self.sensor_angles_rad.append(self.deg_to_r(self.sensor_angles_deg[sens]))
+		self.sensor_angles = np.array(self.sensor_angles_deg)
+		# hills further away are not seen, 0 for no limit
+		self.max_range = sensor_dict.get("max range", 0)
+		# exact or approx, theta is the accuracy of approx, 0 is exact
+		self.mode = sensor_dict.get("mode", "exact")
+		self.theta = sensor_dict.get("theta", 0.5)
+		if self.mode not in ('exact', 'approx', 'lut') :
+			print('Error: unknown sensor mode {}'.format(self.mode))
+			sys.exit(1)
+		# radar or lidar, lidar range and grid cell are in pixels
+		self.sensor_type = sensor_dict.get("type", "radar")
+		self.lidar_range = sensor_dict.get("lidar range", 200)
+		self.lidar_cell = sensor_dict.get("lidar cell", 4)
+		self.lidar_distances = None
+		if self.sensor_type not in ('radar', 'lidar') :
+			print('Error: unknown sensor type {}'.format(self.sensor_type))
+			sys.exit(1)
+		if self.mode == 'lut' and self.sensor_type == 'radar' :
+			self.table, self.table_header = load_table(sensor_dict.get("lut file", "ailab1-sensors.npy"))
+			if self.table_header['angles'] != self.sensor_angles_deg \
+				or self.table_header['max range'] != self.max_range :
+				print('Error: sensor table was built for other sensors, run sensorlut.py')
+				sys.exit(1)
+			self.table_version = -1		# hills version check_table last saw
 		self.power_rcvd = 0.0
+		# kept from the last step by get_sensor_data
+		self.cache_position = None
+		self.cache_heading = None
+		self.cache_version = -1
+		self.hill_ids = None	# exact mode, hillslist index of each source
+		self.anchor = 0j		# exact mode, where hill_ids was found
+		self.sources = None		# complex locations of hills or clusters
+		self.weight = None		# approx mode, hills in each cluster
+		self.distance = None
+		self.sensor_to_hill = None	# unit vector, rows are sensors
+		self.sensor_sums = None
 	
 	# DEF: get_sensor_data def of class Sensors
 	# Desc: for each sensor add vectors to each object.
@@ -52,52 +90,168 @@ class Sensors :
 	# 	lidar returns direction of object, not power
 	#	radar has cosine profile, power = cos(angle), returns angle and power
 	# 	Add one sensor for the target data
-	# Parm: hills - list of hill location coordinates. Exit is the first one.
+	#	type lidar: one ray along each sensor on the occupancy grid of
+	#	Hills, the return is 1 - hit distance / lidar range, real.
+	#	type radar, by mode:
+	#	The hill vectors seen last step are kept. Nothing is done if the
+	#	vehicle and hills did not change, a turn only rotates the kept
+	#	vectors, a move or hill edit updates them, see update_sources.
+	#	mode exact: the hills the grid index of Hills finds in range.
+	#	mode approx: the quadtree of Hills gives clusters, a far group of
+	#	hills is one cluster at its centre of mass, see QuadTree.clusters.
+	#	mode lut: the hills are fixed, their sum is read from the table
+	#	built by sensorlut for the saved hill layout. Hills other than
+	#	that layout are an error, see check_table.
+	# Parm: hills - Hills object of desertmap. Exit is the first hill.
 	# Return: list of neuron complex inputs, each sum of complex received 
 	# 	return from each hill
 	def get_sensor_data( self, hills ) :
-		heading_rad = self.vehicle.heading_rad
-		heading_deg = self.r_to_deg(heading_rad)
-		sensor_inputs = []
-		sensor_results = []
-		if TEST : print('vehicle heading:', heading_deg, ', x to right, y is up')
-		x_range = hills[0].x - self.vehicle.sloc_rect[0]
-		y_range = hills[0].y - self.vehicle.sloc_rect[1] 
-		self.power_rcvd = cmath.sqrt(x_range * x_range + y_range * y_range).real
-		# for each sensor find sum of input vectors
-		for sensor in range(self.num_sensors) :
-			sensor_sum = 0
-			if TEST : print('For sensor pointing at', self.sensor_angles_deg[sensor], 'degrees')
-			for hill in hills : # hill 0 is the  target
-				if TEST : print( '    For hill at x =', hill.x, 'y =', hill.y)
-				x_range = hill.x - self.vehicle.sloc_rect[0]
-				y_range = hill.y - self.vehicle.sloc_rect[1]
-				if TEST : print("       x_range",x_range, "y_range", y_range)
-				hill_angle_deg = self.r_to_deg(cmath.atan(y_range / x_range))
-				sensor_to_hill_deg = (heading_deg + self.sensor_angles_deg[sensor] - hill_angle_deg).real
-				sensor_to_hill_rad = self.deg_to_r(sensor_to_hill_deg)
-				if TEST : print('       sensor', sensor, 'is at angle', int(sensor_to_hill_deg), 'to this hill' )
-				# sqrt returns complex value
-				distance_to_hill = cmath.sqrt(x_range * x_range + y_range * y_range).real
-				if hill == hills[0] :
-					result = complex( (1.0/distance_to_hill),(sensor_to_hill_rad))
-				else:
-					if TEST : print('       distance to hill:{}'.format(int(distance_to_hill)))
-					if abs(sensor_to_hill_deg) > 90 : 
-						print('        angle too big')
-						power_rcvd = 0
-					else:
-						# antenna is a COS pattern, 0 at +/- 90 degrees
-						power_rcvd = 1.0/distance_to_hill * cmath.cos(sensor_to_hill_rad).real
-					result = power_rcvd * cmath.rect(distance_to_hill, sensor_to_hill_rad)
-				if TEST :
-					real,imag = self.trun_comp(result)
-					print('       signal received: {}+{}j'.format(real, imag))
-				sensor_sum += result
-
-			# Each sensor/neuron input is sum of all hills and exit
-			sensor_results.append(sensor_sum)
-		return sensor_results
+		vehicle_x, vehicle_y = self.vehicle.sloc_rect[0], self.vehicle.sloc_rect[1]
+		heading_deg = self.r_to_deg(self.vehicle.heading_rad)
+		moved = (vehicle_x, vehicle_y) != self.cache_position
+		edited = hills.version != self.cache_version
+		if not (moved or edited or heading_deg != self.cache_heading) :
+			return self.sensor_sums.tolist()
+
+		hill_x, hill_y, in_use = hills.arrays()
+		sensor_sums, self.power_rcvd = exit_signal(vehicle_x, vehicle_y,
+			heading_deg, self.sensor_angles, hill_x[0], hill_y[0])
+		if self.sensor_type == 'lidar' :
+			# first hill along each sensor axis, 1 at the vehicle, 0 at range
+			self.lidar_distances = spatial.cast_rays(hills.occupancy(self.lidar_cell),
+				vehicle_x, vehicle_y, np.radians(heading_deg + self.sensor_angles), self.lidar_range)
+			sensor_sums += 1.0 - self.lidar_distances / self.lidar_range
+			seen = int((self.lidar_distances < self.lidar_range).sum())
+		elif self.mode == 'lut' :
+			# fixed hills, read the table built by sensorlut
+			self.check_table(hills)
+			sensor_sums += table_lookup(self.table, self.table_header, vehicle_x, vehicle_y, heading_deg)
+			seen = self.table_header['hills']
+		else :
+			if moved or edited :
+				if self.mode == 'approx' :
+					# distant groups of hills are summed as one at their centre
+					cluster_x, cluster_y, self.weight = hills.tree().clusters(vehicle_x, vehicle_y, self.theta)
+					self.sources = cluster_x + 1j * cluster_y
+				else :
+					self.update_sources(hills, vehicle_x, vehicle_y)
+				self.distance, bearing = hill_bearings(self.sources - complex(vehicle_x, vehicle_y))
+				# unit vector along each sensor
+				directions = np.exp(1j * np.radians(heading_deg + self.sensor_angles))
+				self.sensor_to_hill = directions[:, None] * bearing[None, :]
+			else :
+				# turn only, rotate every sensor to hill vector
+				self.sensor_to_hill *= np.exp(1j * np.radians(heading_deg - self.cache_heading))
+			sensor_sums += radar_sum(self.sensor_to_hill, self.distance, self.max_range, self.weight)
+			seen = len(self.sources)
+
+		self.sensor_sums = sensor_sums
+		self.cache_position = (vehicle_x, vehicle_y)
+		self.cache_heading = heading_deg
+		self.cache_version = hills.version
+		if _trace.debug :
+			_trace.emit('sensors', heading=heading_deg, power=self.power_rcvd, mode=self.mode,
+				moved=moved, edited=edited, hills=seen, sums=sensor_sums.copy())
+		return sensor_sums.tolist()
+
+	# DEF: update_sources def of class Sensors
+	# Desc: keep self.sources, the locations of the hills in reach, for
+	#	exact mode. Reach is max range plus a margin around the anchor,
+	#	the place the grid was last queried, so a short move needs no
+	#	query. Hill edits since the last step are applied from the edit
+	#	log of Hills. The grid is queried again after a move out of the
+	#	margin or too many edits.
+	#	The kept hills are not culled by the sensor cones, a turn only
+	#	rotates them. radar_sum drops the hills behind every sensor.
+	#	"max range" bounds the work, with 0 every hill on the map is
+	#	kept.
+	# Parm: hills - Hills object of desertmap
+	# Parm: vehicle_x, vehicle_y - vehicle location, y is up
+	# Usage: get_sensor_data
+	def update_sources( self, hills, vehicle_x, vehicle_y ) :
+		hill_x, hill_y, in_use = hills.arrays()
+		location = complex(vehicle_x, vehicle_y)
+		margin = self.max_range / 4
+		edits = hills.edits[self.cache_version:]
+		if self.hill_ids is None \
+			or (self.max_range > 0 and abs(location - self.anchor) > margin) \
+			or len(edits) > max(len(self.hill_ids) // 4, 16) :
+			reach = self.max_range + margin if self.max_range > 0 else 0
+			self.hill_ids = hills.query(vehicle_x, vehicle_y, reach)
+			self.sources = hill_x[self.hill_ids] + 1j * hill_y[self.hill_ids]
+			self.anchor = location
+			return
+
+		for hill_id, hill_in_use in edits :
+			if hill_id == 0 :
+				continue
+			if hill_in_use :
+				source = complex(hill_x[hill_id], hill_y[hill_id])
+				if self.max_range == 0 or abs(source - self.anchor) <= self.max_range + margin :
+					self.hill_ids = np.append(self.hill_ids, hill_id)
+					self.sources = np.append(self.sources, source)
+			else :
+				keep = self.hill_ids != hill_id
+				self.hill_ids = self.hill_ids[keep]
+				self.sources = self.sources[keep]
+
+	# DEF: check_table def of class Sensors
+	# Desc: the sensor table holds the sums of one hill layout. Stop if
+	#	the hills are another one, the sums would be of hills that are
+	#	not there. Checked again after every hill edit.
+	# Parm: hills - HillStore of simcore
+	# Usage: get_sensor_data, get_swarm_data
+	def check_table( self, hills ) :
+		if self.table_version == hills.version :
+			return
+		if hills.layout_hash() != self.table_header.get('layout') :
+			print('Error: sensor table was built for other hills, load them or run sensorlut.py')
+			sys.exit(1)
+		self.table_version = hills.version
+
+	# DEF: get_swarm_data def of class Sensors
+	# Desc: sensor data of many vehicles at once, the same values
+	#	get_sensor_data gives for each. Nothing is kept between steps.
+	#	Radar exact and approx sum every hill in use for every vehicle,
+	#	lidar casts all rays together and lut reads all poses together.
+	# Parm: hills - HillStore of simcore. Exit is the first hill.
+	# Parm: vehicle_x, vehicle_y - float arrays, vehicle locations, y is up
+	# Parm: heading_deg - float array, vehicle headings
+	# Return: sensor_sums - complex array (vehicles x sensors)
+	#	power_rcvd - float array, distance of each vehicle to the exit
+	# Usage: simcore.SwarmSim.step
+	def get_swarm_data( self, hills, vehicle_x, vehicle_y, heading_deg ) :
+		hill_x, hill_y, in_use = hills.arrays()
+		location = vehicle_x + 1j * vehicle_y
+		sensor_sums, distance = exit_signal(vehicle_x[:, None], vehicle_y[:, None],
+			heading_deg[:, None], self.sensor_angles[None, :], hill_x[0], hill_y[0])
+		power_rcvd = distance[:, 0]
+		# degrees of each sensor, rows are vehicles
+		sensor_deg = heading_deg[:, None] + self.sensor_angles[None, :]
+
+		if self.sensor_type == 'lidar' :
+			lidar_distances = spatial.cast_rays(hills.occupancy(self.lidar_cell),
+				vehicle_x[:, None], vehicle_y[:, None], np.radians(sensor_deg), self.lidar_range)
+			sensor_sums += 1.0 - lidar_distances / self.lidar_range
+		elif self.mode == 'lut' :
+			self.check_table(hills)
+			sensor_sums += table_lookup(self.table, self.table_header, vehicle_x, vehicle_y, heading_deg)
+		else :
+			in_use = in_use.copy()
+			in_use[0] = False
+			sources = hill_x[in_use] + 1j * hill_y[in_use]
+			directions = np.exp(1j * np.radians(sensor_deg))
+			# vehicles per pass, keeps (vehicles x sensors x hills) small
+			chunk = max(1, 2000000 // max(len(sources) * self.num_sensors, 1))
+			for first in range(0, len(location), chunk) :
+				last = first + chunk
+				distance, bearing = hill_bearings(sources[None, :] - location[first:last, None])
+				sensor_to_hill = directions[first:last, :, None] * bearing[:, None, :]
+				sensor_sums[first:last] += radar_sum(sensor_to_hill, distance, self.max_range)
+		if _trace.debug :
+			_trace.emit('swarm_sensors', vehicles=len(location), mode=self.mode,
+				sums=sensor_sums.copy())
+		return sensor_sums, power_rcvd
 
 	# get_expected_result def of class Sensors
 	# Return: (power received * 2 / range + 0j)  -  not affected by angle 
@@ -113,4 +267,102 @@ class Sensors :
 	# trunc complex values for printing
 	# Return: real, imag
 	def trun_comp( self, comp ):
-		return int(comp.real * 1000 )/1000, int(comp.imag * 1000 )/1000
\ No newline at end of file
+		return int(comp.real * 1000 )/1000, int(comp.imag * 1000 )/1000
+
+# DEF: exit_signal of module sensors
+# Desc: signal of the exit, hill 0, to every sensor.
+#	hill angle = atan(y_range / x_range)
+#	sensor to hill angle = heading + sensor angle - hill angle
+#	signal = 1/distance + j*angle
+# Parm: vehicle_x, vehicle_y - vehicle location, y is up
+# Parm: heading_deg - vehicle heading in degrees
+# Parm: sensor_deg - array of sensor angles in degrees off heading
+# Parm: exit_x, exit_y - exit location
+# Return: complex array, one per sensor, and the distance to the exit
+# Usage: Sensors.get_sensor_data
+def exit_signal(vehicle_x, vehicle_y, heading_deg, sensor_deg, exit_x, exit_y) :
+	x_range = exit_x - vehicle_x
+	y_range = exit_y - vehicle_y
+	distance = np.hypot(x_range, y_range)
+	with np.errstate(divide='ignore', invalid='ignore') :
+		# on the exit itself the angle is 0 and the distance 1 pixel
+		hill_angle_deg = np.degrees(np.nan_to_num(np.arctan(y_range / x_range)))
+		sensor_to_hill_rad = np.radians(heading_deg + sensor_deg - hill_angle_deg)
+		return 1.0 / np.maximum(distance, 1.0) + 1j * sensor_to_hill_rad, distance
+
+# DEF: hill_bearings of module sensors
+# Parm: hill_rel - complex array, hill location less vehicle location
+# Return: distance - float array
+#	bearing - complex array, conjugate of the unit vector to each hill
+# Usage: Sensors.get_sensor_data
+def hill_bearings(hill_rel) :
+	distance = np.abs(hill_rel)
+	with np.errstate(divide='ignore', invalid='ignore') :
+		return distance, np.conj(hill_rel / distance)
+
+# DEF: radar_sum of module sensors
+# Desc: radar return of many hills to every sensor in one numpy pass.
+#	A hill at angle a off a sensor gives cos(a)/distance * rect(distance, a)
+#	= cos(a) * e^(j a). sensor_to_hill is e^(j a), sensor direction
+#	times hill bearing, so cos(a) is its real part and no trig is
+#	needed. A hill counts only when it is inside the +/-90 degree cone
+#	of the sensor, cos(a) >= 0, and within max_range.
+#	A cluster of hills at one place counts weight times.
+# Parm: sensor_to_hill - complex array, rows are sensors, columns hills.
+#	(vehicles x sensors x hills) for a swarm.
+# Parm: distance - float array, distance to each hill, (vehicles x hills)
+#	for a swarm
+# Parm: max_range - pixels, 0 for no limit
+# Parm: weight - array, number of hills at each location, None for 1
+# Return: complex array, sum of the returns for each sensor
+# Usage: Sensors.get_sensor_data, Sensors.get_swarm_data
+def radar_sum(sensor_to_hill, distance, max_range, weight=None) :
+	power = sensor_to_hill.real
+	seen = power >= 0
+	if max_range > 0 :
+		seen &= distance[..., None, :] <= max_range
+	if weight is not None :
+		power = power * weight[..., None, :]
+	return np.where(seen, power * sensor_to_hill, 0.0).sum(axis=-1)
+
+# DEF: load_table of module sensors
+# Desc: open a table built by sensorlut, as a read only memory map
+# Parm: filename - the .npy table, its grid is in filename + ".json"
+# Return: table - complex array (x, y, heading, sensor)
+#	header - dictionary of the grid
+# Usage: Sensors.__init__
+def load_table(filename) :
+	try :
+		with open(filename + '.json') as sidecar :
+			header = json.load(sidecar)
+		table = np.load(filename, mmap_mode='r')
+	except OSError :
+		print('Error: no sensor table {}, run sensorlut.py'.format(filename))
+		sys.exit(1)
+	return table, header
+
+# DEF: table_lookup of module sensors
+# Desc: radar sums at a pose, trilinear from the 8 table entries around
+#	it. Heading wraps around, x and y are held to the table edge.
+# Parm: table, header - from load_table
+# Parm: x, y - vehicle location, y is up, scalars or arrays of poses
+# Parm: heading_deg - vehicle heading in degrees, same shape as x
+# Return: complex array, one sum per sensor, (poses x sensors) for arrays
+# Usage: Sensors.get_sensor_data, Sensors.get_swarm_data
+def table_lookup(table, header, x, y, heading_deg) :
+	fx = np.clip((np.asarray(x, dtype=float) - header['x0']) / header['step'], 0.0, header['nx'] - 1)
+	fy = np.clip((np.asarray(y, dtype=float) - header['y0']) / header['step'], 0.0, header['ny'] - 1)
+	fh = (np.asarray(heading_deg, dtype=float) % 360.0) * header['headings'] / 360.0
+	x0 = np.minimum(fx.astype(int), header['nx'] - 2)
+	y0 = np.minimum(fy.astype(int), header['ny'] - 2)
+	h0 = np.floor(fh).astype(int) % header['headings']
+	h1 = (h0 + 1) % header['headings']
+	tx, ty, th = fx - x0, fy - y0, fh - np.floor(fh)
+	sums = 0
+	# add the 8 corners, each weighted by its nearness on every axis
+	for col, weight_x in ((x0, 1 - tx), (x0 + 1, tx)) :
+		for row, weight_y in ((y0, 1 - ty), (y0 + 1, ty)) :
+			for heading, weight_h in ((h0, 1 - th), (h1, th)) :
+				weight = weight_x * weight_y * weight_h
+				sums = sums + weight[..., None] * table[col, row, heading]
+	return sums
@@ -0,0 +1,776 @@
+# Module: simcore.py
+# Desc: the simulation without a display. Holds the hills, the vehicle
+#	kinematics, the sensors and the AI, and steps them. Needs numpy
+#	only, no pygame, so it runs with no SDL and no window.
+#	desertmap.SimMap is a pygame renderer attached to a Sim, its Hills
+#	and Vehicle add drawing to HillStore and VehicleState.
+#	All coordinates are map coords, x to the right, y up.
+#
+# Classes:
+#	class HillStore - hills, their arrays, grids and edit log
+#	class VehicleState - location, heading and speed, move and limit
+#	class Sim - one vehicle among the hills, driven by the AI
+#	class SwarmState - many vehicles as arrays
+#	class SwarmSim - many vehicles driven by one AI
+#
+#	Usage: python simcore.py [config file] [steps] [hills file]
+#	runs the AI with no display and prints the step rate. With a
+#	"swarm" count over 1 in the config it runs a SwarmSim.
+#
+# Author: Brad Denniston
+# Version: 0.1, 18 Oct 2026
+
+import cmath
+import collections
+import hashlib
+import json
+import math
+import sys
+import time
+import numpy as np
+
+import NeuralNetCmplx
+import sensors
+import spatial
+import tracer
+
+MAP_WIDTH = 400		# map size in pixels
+MAP_HEIGHT = 400
+HILL_SIZE = 10		# 1/2 width and height of a 20x20 hill
+EXIT_LOC = (MAP_WIDTH - 1, MAP_HEIGHT - 33)		# below the menu of the display
+
+_trace = tracer.channel('sim')
+
+# CLASS: HillStore of module simcore
+# Desc: list of hills and what the sensors need of them. The exit is
+#	the first hill. A removed hill stays in the list as 'free' and is
+#	reused by an add at its place.
+# Usage: Sim, desertmap.Hills adds the drawing
+class HillStore :
+
+	# DEF: __init__ of class HillStore
+	# Parm: half_size - 1/2 width and height of a hill in pixels
+	def __init__(self, half_size=HILL_SIZE):
+		self.half_size = half_size
+		# list of all hills
+		self.hillslist = []
+		# hill coordinates as arrays for the vectorized sensors, the
+		# first count entries are used, grown by doubling
+		self.count = 0
+		self.hill_x = np.zeros(64)
+		self.hill_y = np.zeros(64)
+		self.in_use = np.zeros(64, dtype=bool)
+		# every edit is logged as (hill index, in use) and bumps version.
+		# Sensors replays the log since the version it last saw.
+		self.version = 0
+		self.edits = []
+		self.tree_version = -1
+		self.grid_version = None
+		self.cells_version = -1
+		# grid of the hills in use and of the free (removed) hills, a
+		# cell is the size of a hill
+		self.index = spatial.GridIndex(2 * half_size)
+		self.free_index = spatial.GridIndex(2 * half_size)
+
+	# add def of class HillStore
+	# Desc: add a hill, or put back a free hill whose box holds x,y
+	# Parm: x, y - map coords, y up
+	# Return: index of the hill in hillslist
+	def add(self, x, y):
+		size = self.half_size
+		for hill_id in self.free_index.near(x, y) :
+			hill = self.hillslist[hill_id]
+			if abs(x - hill.x) < size and abs(y - hill.y) < size :
+				hill.state = 'inUse'
+				self.free_index.remove(hill_id, hill.x, hill.y)
+				self.index.insert(hill_id, hill.x, hill.y)
+				self.in_use[hill_id] = True
+				self.log_edit(hill_id, True)
+				return hill_id
+
+		# no hill at this location so add a hill object
+		hill = self.Hill(x,y)
+		hill_id = len(self.hillslist)
+		self.index.insert(hill_id, x, y)
+		self.hillslist.append(hill)
+		if self.count == len(self.hill_x) :
+			self.hill_x = np.concatenate((self.hill_x, np.zeros(self.count)))
+			self.hill_y = np.concatenate((self.hill_y, np.zeros(self.count)))
+			self.in_use = np.concatenate((self.in_use, np.zeros(self.count, dtype=bool)))
+		self.hill_x[hill_id] = x
+		self.hill_y[hill_id] = y
+		self.in_use[hill_id] = True
+		self.count += 1
+		self.log_edit(hill_id, True)
+		return hill_id
+
+	# remove def of class HillStore
+	# Desc: free the hill whose box holds x,y. The exit is never removed.
+	# Parm: x, y - map coords, y up
+	# Return: index of the hill in hillslist, None if no hill is there
+	def remove(self, x, y) :
+		size = self.half_size
+		for hill_id in self.index.near(x, y) :
+			hill = self.hillslist[hill_id]
+			if hill_id != 0 and abs(x - hill.x) < size and abs(y - hill.y) < size :
+				hill.state = 'free'
+				self.index.remove(hill_id, hill.x, hill.y)
+				self.free_index.insert(hill_id, hill.x, hill.y)
+				self.in_use[hill_id] = False
+				self.log_edit(hill_id, False)
+				return hill_id
+		return None
+
+	# log_edit def of class HillStore
+	# Desc: record an add or remove, bump the version
+	# Parm: hill_id - index of the hill in hillslist
+	# Parm: in_use - True for an add, False for a remove
+	def log_edit(self, hill_id, in_use):
+		self.edits.append((hill_id, in_use))
+		self.version += 1
+
+	# arrays def of class HillStore
+	# Desc: hill coordinates as arrays for the vectorized sensors,
+	#	kept up to date by add and remove. Index is the hillslist index.
+	# Return: x, y - float arrays, map coords with y up, the exit is first
+	#	in_use - bool array, False for a removed (free) hill
+	def arrays(self):
+		return self.hill_x[:self.count], self.hill_y[:self.count], self.in_use[:self.count]
+
+	# query def of class HillStore
+	# Desc: hills in use that may be in range, see
+	#	spatial.GridIndex.query. The exit is not returned.
+	# Parm: x, y - vehicle location, y is up
+	# Parm: max_range - pixels, 0 for no limit
+	# Return: int array of indexes into hillslist
+	# Usage: Sensors.update_sources
+	def query(self, x, y, max_range):
+		hill_ids = self.index.query(x, y, max_range)
+		return hill_ids[hill_ids != 0]
+
+	# cells def of class HillStore
+	# Desc: the hills in use, not the exit, sorted by grid cell into
+	#	arrays, for sweep_all. The cells are those of index, the table
+	#	covers the occupied ones. Rebuilt only after an edit.
+	# Return: column, row - grid cell of table entry 0
+	#	columns, rows - size of the table in cells
+	#	starts - int array, the hills of table cell c = column * rows + row
+	#		are hill_ids[starts[c]:starts[c + 1]]
+	#	hill_ids - int array, indexes into hillslist
+	#	totals - int array, (columns + 1) x (rows + 1), the number of
+	#		hills in the cells left of and below each corner
+	def cells(self):
+		if self.cells_version != self.version :
+			hill_x, hill_y, in_use = self.arrays()
+			hill_ids = np.flatnonzero(in_use[1:]) + 1
+			size = self.index.cell_size
+			column = np.floor(hill_x[hill_ids] / size).astype(int)
+			row = np.floor(hill_y[hill_ids] / size).astype(int)
+			if len(hill_ids) == 0 :
+				first_column, first_row, columns, rows = 0, 0, 0, 0
+			else :
+				first_column, first_row = column.min(), row.min()
+				columns, rows = column.max() - first_column + 1, row.max() - first_row + 1
+			cell = (column - first_column) * rows + (row - first_row)
+			order = np.argsort(cell, kind='stable')
+			starts = np.searchsorted(cell[order], np.arange(columns * rows + 1))
+			totals = np.zeros((columns + 1, rows + 1), dtype=int)
+			totals[1:, 1:] = np.diff(starts).reshape(columns, rows).cumsum(axis=0).cumsum(axis=1)
+			self.cell_table = (first_column, first_row, columns, rows, starts, hill_ids[order], totals)
+			self.cells_version = self.version
+		return self.cell_table
+
+	# sweep def of class HillStore
+	# Desc: first hill hit by a box moving along a segment. Each hill
+	#	box is grown by the half size of the moving box, then the
+	#	segment is clipped to it (slab test). Only hills in the grid
+	#	cells around the segment are tested, a step is short so that
+	#	is a few cells. The exit and hills that already hold the start
+	#	point are not hit, so a vehicle can drive out of a hill.
+	#	sweep_all is the same test for many boxes at once.
+	# Parm: start, end - complex, centre of the box before and after
+	# Parm: half_size - 1/2 width of the moving box
+	# Return: (t, hill index), t in 0..1 is the part of the move done
+	#	before the hit. None if nothing is hit.
+	# Usage: VehicleState.limit
+	def sweep(self, start, end, half_size):
+		reach = self.half_size + half_size
+		hill_ids = self.index.box(min(start.real, end.real) - reach, min(start.imag, end.imag) - reach,
+			max(start.real, end.real) + reach, max(start.imag, end.imag) + reach)
+		hill_ids = np.array([hill_id for hill_id in hill_ids if hill_id != 0], dtype=int)
+		if len(hill_ids) == 0 :
+			return None
+		centre_x, centre_y = self.hill_x[hill_ids], self.hill_y[hill_ids]
+		move = end - start
+		t_in, t_out = np.zeros(len(hill_ids)), np.ones(len(hill_ids))
+		for begin, step, centre in ((start.real, move.real, centre_x), (start.imag, move.imag, centre_y)) :
+			low, high = centre - reach, centre + reach
+			if step == 0 :
+				# beside the hill on this axis, never in it
+				t_in[(begin <= low) | (begin >= high)] = 2.0
+				continue
+			t_low, t_high = (low - begin) / step, (high - begin) / step
+			t_in = np.maximum(t_in, np.minimum(t_low, t_high))
+			t_out = np.minimum(t_out, np.maximum(t_low, t_high))
+		# the vehicle is in whole pixels, allow a pixel at the edge
+		inside = (np.abs(start.real - centre_x) < reach - 1) & (np.abs(start.imag - centre_y) < reach - 1)
+		t_in[(t_in >= t_out) | inside] = 2.0
+		first = np.argmin(t_in)
+		if t_in[first] > 1.0 :
+			return None
+		return float(t_in[first]), int(hill_ids[first])
+
+	# sweep_all def of class HillStore
+	# Desc: first hill hit by each of many boxes moving along segments,
+	#	all boxes at once. Each hill box is grown by the half size of
+	#	the moving box, then the segment is clipped to it (slab test).
+	#	Only hills in the grid cells the grown segment box covers are
+	#	tested, a step is short so that is a few cells. Boxes with no
+	#	hill in their cells are dropped first, from the cell totals.
+	#	Every (box, cell) pair and then every (box, hill) pair is made
+	#	with repeat from the cells table, the slab test runs on the 
+	#	pairs and a sort by box and t finds the first hit of each box.
+	#	The exit and hills that already hold the start point are not
+	#	hit, so a vehicle can drive out of a hill.
+	#	The result for each box is that of sweep.
+	# Parm: start, end - complex arrays, centre of each box before and after
+	# Parm: half_size - 1/2 width of the moving boxes
+	# Return: t - float array, the part of each move done before the hit,
+	#	over 1 where nothing is hit
+	#	hill_ids - int array, the hill hit, -1 where nothing is hit
+	# Usage: SwarmState.limit
+	def sweep_all(self, start, end, half_size):
+		reach = self.half_size + half_size
+		t = np.full(len(start), 2.0)
+		hit_ids = np.full(len(start), -1)
+		first_column, first_row, columns, rows, starts, cell_hills, totals = self.cells()
+		if len(cell_hills) == 0 or len(start) == 0 :
+			return t, hit_ids
+		
+		# table cells covered by the box around each grown segment
+		size = self.index.cell_size
+		col_min = np.clip(np.floor((np.minimum(start.real, end.real) - reach) / size).astype(int) - first_column, 0, columns)
+		col_max = np.clip(np.floor((np.maximum(start.real, end.real) + reach) / size).astype(int) - first_column, -1, columns - 1)
+		row_min = np.clip(np.floor((np.minimum(start.imag, end.imag) - reach) / size).astype(int) - first_row, 0, rows)
+		row_max = np.clip(np.floor((np.maximum(start.imag, end.imag) + reach) / size).astype(int) - first_row, -1, rows - 1)
+		box_rows = np.maximum(row_max - row_min + 1, 0)
+		cell_count = np.maximum(col_max - col_min + 1, 0) * box_rows
+		# hills in the cells of each box, from the totals at its corners
+		col_end, row_end = np.maximum(col_max + 1, col_min), np.maximum(row_max + 1, row_min)
+		near = totals[col_end, row_end] - totals[col_min, row_end] \
+			- totals[col_end, row_min] + totals[col_min, row_min]
+		if not near.any() :
+			return t, hit_ids
+		cell_count[near == 0] = 0
+		
+		# one entry per (box, cell)
+		box = np.repeat(np.arange(len(start)), cell_count)
+		k = np.arange(len(box)) - np.repeat(np.cumsum(cell_count) - cell_count, cell_count)
+		cell = (col_min[box] + k // box_rows[box]) * rows + row_min[box] + k % box_rows[box]
+		# one entry per (box, hill)
+		hill_count = starts[cell + 1] - starts[cell]
+		first = np.repeat(starts[cell] - (np.cumsum(hill_count) - hill_count), hill_count)
+		hill_ids = cell_hills[first + np.arange(len(first))]
+		box = np.repeat(box, hill_count)
+		if len(box) == 0 :
+			return t, hit_ids
+		
+		begin = start[box]
+		move = end[box] - begin
+		t_in, t_out = np.zeros(len(box)), np.ones(len(box))
+		missed = np.zeros(len(box), dtype=bool)
+		for begin_axis, step, centre in ((begin.real, move.real, self.hill_x[hill_ids]), 
+				(begin.imag, move.imag, self.hill_y[hill_ids])) :
+			low, high = centre - reach - begin_axis, centre + reach - begin_axis
+			with np.errstate(divide='ignore', invalid='ignore') :
+				t_low, t_high = low / step, high / step
+			# no move on this axis, beside the hill is never in it
+			still = step == 0
+			missed |= still & ((low >= 0) | (high <= 0))
+			t_in = np.maximum(t_in, np.where(still, 0.0, np.minimum(t_low, t_high)))
+			t_out = np.minimum(t_out, np.where(still, 1.0, np.maximum(t_low, t_high)))
+		# the vehicle is in whole pixels, allow a pixel at the edge
+		inside = (np.abs(begin.real - self.hill_x[hill_ids]) < reach - 1) \
+			& (np.abs(begin.imag - self.hill_y[hill_ids]) < reach - 1)
+		t_in[missed | inside | (t_in >= t_out)] = 2.0
+		
+		# first hit of each box
+		order = np.lexsort((t_in, box))
+		box = box[order]
+		leading = np.concatenate(([True], box[1:] != box[:-1]))
+		first, boxes = order[leading], box[leading]
+		t[boxes] = t_in[first]
+		hit_ids[boxes] = np.where(t_in[first] > 1.0, -1, hill_ids[first])
+		return t, hit_ids
+
+	# save def of class HillStore
+	# Desc: write the hills in use, exit first, as an (n, 2) array of
+	#	map coords, y up. Read by sensorlut and load.
+	# Parm: filename - .npy file
+	# Usage: SimMap.menu_save
+	def save(self, filename):
+		hill_x, hill_y, in_use = self.arrays()
+		np.save(filename, np.stack((hill_x[in_use], hill_y[in_use]), axis=1))
+
+	# load def of class HillStore
+	# Desc: replace the hills with those of a file written by save, the
+	#	first one is the exit. A store that has its exit keeps it and
+	#	frees every other hill first.
+	# Parm: filename - .npy file
+	# Usage: SimMap.menu_load, sensorlut, python simcore.py
+	def load(self, filename):
+		layout = np.load(filename).tolist()
+		if self.count == 0 :
+			self.add(*layout[0])
+		for hill_id in (np.flatnonzero(self.in_use[1:self.count]) + 1).tolist() :
+			# remove frees a hill whose box holds x,y, not always this one
+			while self.in_use[hill_id] :
+				self.remove(self.hill_x[hill_id], self.hill_y[hill_id])
+		for x, y in layout[1:] :
+			self.add(x, y)
+
+	# layout_hash def of class HillStore
+	# Desc: names the hills in use, not the exit, and the map size,
+	#	whatever order the hills were added in. sensorlut keeps it
+	#	with a sensor table, Sensors checks the hills against it.
+	# Return: hex string
+	def layout_hash(self):
+		hill_x, hill_y, in_use = self.arrays()
+		in_use = in_use.copy()
+		in_use[:1] = False
+		hills = np.stack((hill_x[in_use], hill_y[in_use]), axis=1)
+		hills = hills[np.lexsort((hills[:, 1], hills[:, 0]))]
+		digest = hashlib.sha1(np.array([MAP_WIDTH, MAP_HEIGHT], dtype=np.float64).tobytes())
+		digest.update(np.ascontiguousarray(hills, dtype=np.float64).tobytes())
+		return digest.hexdigest()
+
+	# occupancy def of class HillStore
+	# Desc: occupancy grid of the hills in use, not the exit, for the
+	#	lidar. A hill fills its box. Rebuilt only after an edit or a
+	#	change of cell size.
+	# Parm: cell - grid cell width in pixels
+	# Return: see spatial.rasterize
+	# Usage: Sensors.get_sensor_data
+	def occupancy(self, cell):
+		if self.grid_version != (self.version, cell) :
+			hill_x, hill_y, in_use = self.arrays()
+			in_use = in_use.copy()
+			in_use[0] = False
+			self.grid = spatial.rasterize(hill_x[in_use], hill_y[in_use], self.half_size, cell)
+			self.grid_version = (self.version, cell)
+		return self.grid
+
+	# tree def of class HillStore
+	# Desc: quadtree of the hills in use, not the exit, for the
+	#	approximate sensors. Rebuilt only after an edit.
+	# Return: spatial.QuadTree
+	# Usage: Sensors.get_sensor_data
+	def tree(self):
+		if self.tree_version != self.version :
+			hill_x, hill_y, in_use = self.arrays()
+			in_use = in_use.copy()
+			in_use[0] = False
+			self.quadtree = spatial.QuadTree(hill_x[in_use], hill_y[in_use])
+			self.tree_version = self.version
+		return self.quadtree
+
+	# Hill inner class of class HillStore
+	# Desc: defines a hill object. Sets state to inUse.
+	class Hill :
+		# __init__ def of classs Hill
+		# Desc: create a hill with state 'inUse'
+		def __init__(self, x, y):
+			self.x = x
+			self.y = y
+			self.state = 'inUse'
+
+# CLASS: VehicleState of module simcore
+# Desc: where the vehicle is, where it points and how fast it goes.
+#	With hills set, a move that would enter a hill stops at its edge,
+#	the speed drops to 0 and a collision event is kept.
+# Usage: Sim, vehicle.Vehicle adds the drawing
+class VehicleState :
+	# DEF: __init__ of class VehicleState
+	# Parm: width, height - the vehicle stays inside 0..width, 0..height
+	# Parm: config - dictionary of configuration data
+	def __init__(self, width, height, config) :
+		self.width = width
+		self.height = height
+		# hills to collide with, a HillStore, set by Sim
+		self.hills = None
+		self.half_size = HILL_SIZE		# the vehicle is 20 x 20 too
+		# last collisions, oldest first, and how many there were
+		self.collisions = collections.deque(maxlen=256)
+		self.collision_count = 0
+
+		# vehicle location on the map
+		self.sloc_rect = [self.width/2, self.height/2] # center as screen_x,screen_y: rectangular
+		self.sloc_comp = (self.width/2 + self.height/2 * 1j)
+
+		# current heading, start pointing North
+		self.heading_deg = 90.0
+		self.heading_rad = math.radians(self.heading_deg)
+
+		# current speed initially is 5 pixels per turn
+		self.max_speed = 20
+		self.speed = 5
+
+		# previous speed_change and angle_change in polar
+		self.previous_change_command_comp = (0 + 0j)
+
+	# DEF: user_key of class VehicleState
+	# Desc:
+	#	left,right arrow key - modify change direction by +/- 30 degrees
+	#   up,down arrow keys - add/subtract 5 from speed
+	#	space - no change
+	#	other keys - repeat the previous change
+	# Parm: key - that was activated
+	# Return: polar direction change and magnitude of change, same as AI return.
+	#	A return of (0,0) results in no change in speed or angle
+	# Usage: user input, from main
+	def user_key( self, key ):
+		if key == 'right' :
+			speed_change = 0
+			angle_change = math.radians(-30)
+		elif key == 'left' :
+			speed_change = 0
+			angle_change = math.radians(30)
+		elif key == 'up' :
+			speed_change = 5
+			angle_change = 0
+		elif key == 'down' :
+			speed_change = -5
+			angle_change = 0
+		elif key == 'space' :
+			return (0 + 0j)
+		else:
+			return self.previous_change_command_comp
+
+		# return complex direction change and speed change
+		return speed_change * (math.cos(angle_change) + math.sin(angle_change) * 1j)
+
+	# DEF: move of class VehicleState
+	# Desc: change vehicle location by adding a change_vector
+	# 	Called after keyboard key or AI command.
+	# Parm: change_vector_comp - polar speed change and direction change.
+	#	if (0,0) then no change, move per current heading and speed
+	# Return: new location, see limit
+	def move( self, change_vector_comp ) :
+		speed_change = abs(change_vector_comp)
+		angle_change_rad = cmath.phase(change_vector_comp)
+
+		new_angle = self.heading_rad + angle_change_rad
+		new_speed = self.speed + speed_change
+
+		change_vector_comp = new_speed * (math.cos(new_angle) + math.sin(new_angle)*1j)
+		self.previous_change_command_comp = change_vector_comp
+
+		# don't go past map boundaries or into a hill
+		# don't go too fast
+		return self.limit(change_vector_comp)
+
+	# DEF: limit of class VehicleState
+	# Desc: apply proposed change to current loc and test against
+	#	hills and map edges
+	# Parm: change_vector_comp - real is speed change, imag is angle change
+	# Ref: self.sloc_comp - current location
+	# Ref: self.speed - current speed
+	# Ref: self.heading_rad - current direction of travel
+	# Return: new location, destination of the move
+	# Usage: move
+	def limit(self, change_vector_comp):
+		speed_change = change_vector_comp.real
+		angle_change = change_vector_comp.imag
+
+		self.speed += speed_change
+		if self.speed < 0 :
+			self.speed = -self.speed
+			angle_change = angle_change - math.pi # back up
+
+		# speed limit
+		if self.speed > self.max_speed : self.speed = self.max_speed
+
+		self.heading_rad = self.heading_rad + angle_change
+		self.heading_deg = math.degrees(self.heading_rad)
+
+		change_vector_comp = (self.speed + angle_change *1j)
+
+		# add the change vector to the current location, limit by walls
+		start = self.sloc_comp
+		end = self.sloc_comp + change_vector_comp
+		end = complex(min(max(end.real, 0), self.width), min(max(end.imag, 0), self.height))
+		self.sloc_comp = end
+
+		# don't go into a hill, stop at its edge. The move is the one
+		# left after the walls, a vehicle sliding along a wall can hit.
+		if self.hills is not None :
+			hit = self.hills.sweep(start, end, self.half_size)
+			if hit is not None :
+				t, hill_id = hit
+				self.sloc_comp = start + t * (end - start)
+				self.speed = 0
+				self.collision_count += 1
+				event = {'hill' : hill_id, 'location' : self.sloc_comp, 'part' : t}
+				self.collisions.append(event)
+				if _trace.info: _trace.emit('collision', **event)
+
+		# convert complex location vector to whole pixels
+		sLocX = int(self.sloc_comp.real)
+		if sLocX < 0 : sLocX = 0
+		if sLocX > self.width : sLocX = self.width
+
+		sLocY = int(self.sloc_comp.imag)
+		if sLocY < 0 : sLocY = 0
+		if sLocY > self.height : sLocY = self.height
+
+		# convert back to complex
+		self.sloc_comp = (sLocX + sLocY * 1j)
+		self.sloc_rect = (sLocX, sLocY)
+		return( self.sloc_rect )
+
+# CLASS: Sim of module simcore
+# Desc: one vehicle among the hills, sensed and driven by the AI.
+#	Made headless, or by desertmap.SimMap with its drawing Hills and
+#	Vehicle.
+class Sim :
+	# DEF: __init__ of class Sim
+	# Parm: config - dictionary of configuration data
+	# Parm: hills - a HillStore, None for a new store holding the exit
+	# Parm: vehicle - a VehicleState, None for a new one on the map
+	def __init__(self, config, hills=None, vehicle=None) :
+		tracer.configure(config)
+		if hills is None :
+			hills = HillStore()
+			hills.add(*EXIT_LOC)
+		if vehicle is None :
+			vehicle = VehicleState(MAP_WIDTH, MAP_HEIGHT, config)
+		self.hills = hills
+		self.vehicle = vehicle
+		self.vehicle.hills = hills
+		self.sensors = sensors.Sensors(self.vehicle, self.hills, config)
+		self.AI = NeuralNetCmplx.NeuralNetCmplx(config)
+		self.drive_mode = 'ai'		# ai or manual
+		self.step_count = 0
+
+	# DEF: step of class Sim
+	# Desc: advance the vehicle one step. Manual repeats the last
+	#	move, AI senses, adapts and moves per the AI command.
+	# Return: True to move vehicle and run again, False at optimal result
+	def step(self) :
+		self.step_count += 1
+		if self.drive_mode == 'manual' :
+			self.vehicle.move(self.vehicle.user_key('space'))
+			return True
+
+		# new input set, normalize magnitudes
+		sensor_data = self.sensors.get_sensor_data( self.hills )
+		sensor_data = normalize_complex_set(sensor_data)
+
+		# get reference signal received as if at the exit (0 angle, full power)
+		target_value = self.sensors.get_expected_result()
+		mag,angle = cmath.polar(target_value)
+
+		# normalize target magnitude to 1
+		target_result = complex(1,angle)
+		if _trace.info: _trace.emit('target', target_result=target_result)
+
+		# compute a change of direction and speed for the vehicle (complex)
+		vehicle_command = self.AI.adapt(sensor_data, target_result, True)
+		if vehicle_command == -1 : # AI is at the optimal result
+			return False
+
+		self.vehicle.move(vehicle_command)
+		return True
+
+	# DEF: run of class Sim
+	# Desc: step until the AI is at the optimal result
+	# Parm: steps - most steps to take
+	# Return: number of steps taken
+	def run(self, steps) :
+		for count in range(steps) :
+			if not self.step() :
+				return count + 1
+		return steps
+
+# CLASS: SwarmState of module simcore
+# Desc: many vehicles as arrays, one entry per vehicle. move and limit
+#	are VehicleState.move and limit done for all vehicles at once.
+# Usage: SwarmSim
+class SwarmState :
+	# DEF: __init__ of class SwarmState
+	# Parm: count - number of vehicles
+	# Parm: width, height - the vehicles stay inside 0..width, 0..height
+	# Parm: seed - random start places and headings, None for all at the
+	#	centre pointing North like VehicleState
+	def __init__(self, count, width, height, seed=None) :
+		self.count = count
+		self.width = width
+		self.height = height
+		if seed is None :
+			self.sloc_comp = np.full(count, width/2 + height/2 * 1j)
+			self.heading_rad = np.full(count, math.pi / 2)
+		else :
+			rng = np.random.default_rng(seed)
+			self.sloc_comp = np.trunc(rng.uniform(0, width, count)) \
+				+ 1j * np.trunc(rng.uniform(0, height, count))
+			self.heading_rad = rng.uniform(-math.pi, math.pi, count)
+		self.speed = np.full(count, 5.0)
+		self.max_speed = 20
+		self.previous_change_command_comp = np.zeros(count, dtype=complex)
+		# hills to collide with, as VehicleState, set by SwarmSim
+		self.hills = None
+		self.half_size = HILL_SIZE
+		# last collisions, oldest first, and how many there were
+		self.collisions = collections.deque(maxlen=256)
+		self.collision_count = 0
+
+	# DEF: move of class SwarmState
+	# Parm: change_vector_comp - complex array, one change per vehicle,
+	#	or one change for all
+	# Return: new locations, complex array
+	def move( self, change_vector_comp ) :
+		change_vector_comp = np.broadcast_to(change_vector_comp, (self.count,))
+		new_angle = self.heading_rad + np.angle(change_vector_comp)
+		new_speed = self.speed + np.abs(change_vector_comp)
+		change_vector_comp = new_speed * np.exp(1j * new_angle)
+		self.previous_change_command_comp = change_vector_comp
+		return self.limit(change_vector_comp)
+
+	# DEF: limit of class SwarmState
+	# Parm: change_vector_comp - complex array, real is speed change,
+	#	imag is angle change
+	# Return: new locations, complex array
+	def limit(self, change_vector_comp):
+		angle_change = change_vector_comp.imag
+		self.speed = self.speed + change_vector_comp.real
+		# back up
+		backward = self.speed < 0
+		self.speed = np.minimum(np.abs(self.speed), self.max_speed)
+		angle_change = np.where(backward, angle_change - math.pi, angle_change)
+
+		self.heading_rad = self.heading_rad + angle_change
+		start = self.sloc_comp
+		end = self.sloc_comp + self.speed + angle_change * 1j
+		# inside the walls, then stop at the edge of a hill in the way
+		end = np.clip(end.real, 0, self.width) + 1j * np.clip(end.imag, 0, self.height)
+		if self.hills is not None :
+			moving = np.flatnonzero(end != start)
+			t, hill_ids = self.hills.sweep_all(start[moving], end[moving], self.half_size)
+			hit = t <= 1.0
+			vehicles, t, hill_ids = moving[hit], t[hit], hill_ids[hit]
+			end[vehicles] = start[vehicles] + t * (end[vehicles] - start[vehicles])
+			self.speed[vehicles] = 0
+			self.collision_count += len(vehicles)
+			# an event per vehicle, as VehicleState.limit keeps them. Only
+			# the last ones fit in collisions unless they are traced.
+			kept = slice(None) if _trace.info else slice(-self.collisions.maxlen, None)
+			for vehicle, hill_id, part in zip(vehicles[kept].tolist(), hill_ids[kept].tolist(), t[kept].tolist()) :
+				event = {'vehicle' : vehicle, 'hill' : hill_id, 'location' : complex(end[vehicle]), 'part' : part}
+				self.collisions.append(event)
+				if _trace.info: _trace.emit('collision', **event)
+		# whole pixels
+		self.sloc_comp = np.trunc(end.real) + 1j * np.trunc(end.imag)
+		return self.sloc_comp
+
+# CLASS: SwarmSim of module simcore
+# Desc: many vehicles among the same hills, all driven and trained by
+#	one AI. A step senses all vehicles, feeds them to the AI as one
+#	batch and moves them all.
+#	Config, all keys optional:
+#	"swarm" : { "count" : 100, "seed" : 1, "train" : true }
+#	With train false the AI only infers, the weights do not change.
+class SwarmSim :
+	# DEF: __init__ of class SwarmSim
+	# Parm: config - dictionary of configuration data
+	# Parm: hills - a HillStore, None for a new store holding the exit
+	def __init__(self, config, hills=None) :
+		tracer.configure(config)
+		if hills is None :
+			hills = HillStore()
+			hills.add(*EXIT_LOC)
+		swarm_dict = config.get('swarm', dict())
+		self.hills = hills
+		self.swarm = SwarmState(swarm_dict.get('count', 100), MAP_WIDTH, MAP_HEIGHT,
+			swarm_dict.get('seed', 1))
+		self.swarm.hills = hills
+		self.sensors = sensors.Sensors(None, self.hills, config)
+		self.AI = NeuralNetCmplx.NeuralNetCmplx(config)
+		self.train = swarm_dict.get('train', True)
+		self.step_count = 0
+
+	# DEF: step of class SwarmSim
+	# Desc: sense, adapt or infer, and move every vehicle
+	# Return: True to run again, False when every vehicle is at the
+	#	optimal result. Always True without training.
+	def step(self) :
+		self.step_count += 1
+		swarm = self.swarm
+		sensor_data, power_rcvd = self.sensors.get_swarm_data(self.hills,
+			swarm.sloc_comp.real, swarm.sloc_comp.imag, np.degrees(swarm.heading_rad))
+		sensor_data = normalize_complex_rows(sensor_data)
+		if not self.train :
+			swarm.move(self.AI.infer(sensor_data))
+			return True
+		# target as in Sim.step, magnitude 1 at the angle of the exit power
+		target_result = 1 + 1j * np.angle(power_rcvd * 2 + 0j)
+		vehicle_command = self.AI.adapt(sensor_data, target_result, True)
+		if isinstance(vehicle_command, int) and vehicle_command == -1 :
+			return False
+		swarm.move(vehicle_command)
+		return True
+
+	# DEF: run of class SwarmSim
+	# Parm: steps - most steps to take
+	# Return: number of steps taken
+	def run(self, steps) :
+		for count in range(steps) :
+			if not self.step() :
+				return count + 1
+		return steps
+
+# DEF: normalize_complex_set of module simcore
+# Desc: get largest magnitude, use to normalize magnitudes
+# Parm: set - a list of complex values
+# Return: normalized list of complex values
+def normalize_complex_set( set ):
+	max = 0
+	size = len(set)
+	for index in range(size):
+		mag, angle = cmath.polar(set[index])
+		if mag > max : max = mag
+	for index in range(size):
+		mag, angle = cmath.polar(set[index])
+		mag = mag / max
+		set[index] = complex(mag, angle)
+	if _trace.debug: _trace.emit('normalized', sensor_data=list(set))
+	return set
+
+# DEF: normalize_complex_rows of module simcore
+# Desc: normalize_complex_set for each row of an array
+# Parm: sets - complex array, one set per row
+# Return: complex array, magnitude / largest magnitude of the row
+#	+ j angle, as normalize_complex_set makes it
+def normalize_complex_rows( sets ):
+	mags = np.abs(sets)
+	return mags / mags.max(axis=1, keepdims=True) + 1j * np.angle(sets)
+
+if __name__ == '__main__' :
+	config_name = sys.argv[1] if len(sys.argv) > 1 else 'config-ailab1.jsn'
+	steps = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+	with open(config_name) as config_file :
+		config = json.load(config_file)
+	hills = None
+	if len(sys.argv) > 3 :
+		hills = HillStore()
+		hills.load(sys.argv[3])
+	if config.get('swarm', dict()).get('count', 1) > 1 :
+		sim = SwarmSim(config, hills)
+		vehicles = sim.swarm.count
+	else :
+		sim = Sim(config, hills)
+		vehicles = 1
+	start = time.perf_counter()
+	taken = sim.run(steps)
+	elapsed = time.perf_counter() - start
+	print('{} steps of {} vehicles in {:.2f} s, {:.0f} steps/s'.format(taken, vehicles,
+		elapsed, taken / elapsed))
@@ -0,0 +1,308 @@
+# Module: spatial.py
+# Desc: uniform grid index over points on the map, used to find the
+#	hills near the vehicle without walking the whole hill list.
+#	The map is cut into square cells of cell_size pixels. Each cell
+#	that holds a point keeps a list of the ids of its points.
+#	A query keeps only the cells that can hold a point inside the
+#	range circle, so its cost follows the number of nearby cells, not
+#	the number of points.
+#
+# Classes:
+#	class GridIndex - the grid, insert, remove, near, box, query
+#	class QuadTree - centre of mass tree for far field sums
+#	rasterize, cast_rays - occupancy grid and lidar rays
+#
+# Author: Brad Denniston
+# Version: 0.1, 18 Oct 2026
+
+import itertools
+import numpy as np
+
+# CLASS: GridIndex of module spatial
+# Desc: uniform grid of cells, each a list of point ids
+# Usage: desertmap.Hills keeps one for its hills
+class GridIndex :
+	# DEF: __init__ of class GridIndex
+	# Parm: cell_size - width and height of a cell in pixels
+	def __init__(self, cell_size) :
+		self.cell_size = cell_size
+		self.cells = dict()		# (column, row) : list of ids
+		self.cell_keys = None	# array of occupied cells, made by query
+		self.count = 0
+
+	# DEF: cell of class GridIndex
+	# Return: (column, row) of the cell holding x,y
+	def cell(self, x, y) :
+		return (int(x // self.cell_size), int(y // self.cell_size))
+
+	# DEF: insert of class GridIndex
+	# Parm: point_id - caller's number for the point, an index into its list
+	# Parm: x, y - location of the point
+	def insert(self, point_id, x, y) :
+		key = self.cell(x, y)
+		if key not in self.cells :
+			self.cells[key] = []
+			self.cell_keys = None
+		self.cells[key].append(point_id)
+		self.count += 1
+
+	# DEF: remove of class GridIndex
+	# Parm: point_id, x, y - as given to insert
+	def remove(self, point_id, x, y) :
+		key = self.cell(x, y)
+		self.cells[key].remove(point_id)
+		if len(self.cells[key]) == 0 :
+			del self.cells[key]
+			self.cell_keys = None
+		self.count -= 1
+
+	# DEF: near of class GridIndex
+	# Desc: ids in the cell of x,y and the 8 cells around it. Finds every
+	#	point within cell_size of x,y.
+	# Return: list of ids
+	def near(self, x, y) :
+		column, row = self.cell(x, y)
+		ids = []
+		for key in itertools.product((column - 1, column, column + 1), (row - 1, row, row + 1)) :
+			ids.extend(self.cells.get(key, ()))
+		return ids
+
+	# DEF: box of class GridIndex
+	# Desc: ids in every cell that overlaps a box
+	# Parm: x_min, y_min, x_max, y_max - corners of the box
+	# Return: list of ids
+	def box(self, x_min, y_min, x_max, y_max) :
+		col_min, row_min = self.cell(x_min, y_min)
+		col_max, row_max = self.cell(x_max, y_max)
+		ids = []
+		for key in itertools.product(range(col_min, col_max + 1), range(row_min, row_max + 1)) :
+			ids.extend(self.cells.get(key, ()))
+		return ids
+
+	# DEF: query of class GridIndex
+	# Desc: ids of the points in every cell that may be inside the range
+	#	circle. The result can hold points that are a little out of
+	#	range, the caller does the exact test on this short list.
+	# Parm: x, y - location of the sensors
+	# Parm: max_range - radius of the circle, 0 for no limit
+	# Return: int array of ids
+	def query(self, x, y, max_range) :
+		if self.count == 0 :
+			return np.zeros(0, dtype=int)
+		if self.cell_keys is None :
+			self.cell_keys = np.array(list(self.cells.keys()), dtype=float).reshape(-1, 2)
+		# corners of every occupied cell relative to x,y
+		left = self.cell_keys[:, 0] * self.cell_size - x
+		bottom = self.cell_keys[:, 1] * self.cell_size - y
+		right = left + self.cell_size
+		top = bottom + self.cell_size
+		keep = np.ones(len(self.cell_keys), dtype=bool)
+
+		if max_range > 0 :
+			# distance from x,y to the nearest point of the cell
+			dx = np.maximum(np.maximum(left, -right), 0.0)
+			dy = np.maximum(np.maximum(bottom, -top), 0.0)
+			keep &= dx * dx + dy * dy <= max_range * max_range
+
+		keys = self.cell_keys[keep].astype(int)
+		return np.fromiter(itertools.chain.from_iterable(
+			self.cells[(column, row)] for column, row in keys.tolist()), dtype=int)
+
+# CLASS: QuadTree of module spatial
+# Desc: quadtree over a fixed set of points, each node holds the count
+#	and centre of mass of its points. Built all at once from arrays:
+#	the points are sorted by Morton code, the bits of x and y
+#	interleaved, so every node at every level is a run of sorted
+#	points and its children are a run of nodes on the next level.
+#	clusters() walks the tree a level at a time with numpy. A node far
+#	enough away, size < theta * distance, is given as one cluster at
+#	its centre of mass and its children are not visited.
+# Usage: desertmap.Hills builds one for the approximate sensors
+class QuadTree :
+	DEPTH = 16		# levels below the root, points are placed on a 2^16 grid
+
+	# DEF: __init__ of class QuadTree
+	# Parm: x, y - float arrays, location of the points
+	def __init__(self, x, y) :
+		self.count = len(x)
+		self.levels = []
+		if self.count == 0 :
+			return
+		x_min, y_min = x.min(), y.min()
+		extent = max(x.max() - x_min, y.max() - y_min, 1.0)
+		scale = ((1 << self.DEPTH) - 1) / extent
+		code = spread_bits(((x - x_min) * scale).astype(np.int64)) \
+			| (spread_bits(((y - y_min) * scale).astype(np.int64)) << 1)
+		order = np.argsort(code, kind='stable')
+		code = code[order]
+		# running sums, a node holding sorted points start..end has
+		# sum_x = cum_x[end] - cum_x[start]
+		cum_x = np.concatenate(([0.0], np.cumsum(x[order])))
+		cum_y = np.concatenate(([0.0], np.cumsum(y[order])))
+
+		for level in range(self.DEPTH + 1) :
+			keys, start = np.unique(code >> (2 * (self.DEPTH - level)), return_index=True)
+			end = np.append(start[1:], self.count)
+			count = end - start
+			self.levels.append({
+				'start' : start,
+				'end' : end,
+				'count' : count,
+				'x' : (cum_x[end] - cum_x[start]) / count,
+				'y' : (cum_y[end] - cum_y[start]) / count,
+				'size' : extent / (1 << level),
+				})
+		# children of a node are the nodes of the next level that start
+		# inside it
+		for level in range(self.DEPTH) :
+			node = self.levels[level]
+			next_start = self.levels[level + 1]['start']
+			node['child_lo'] = np.searchsorted(next_start, node['start'])
+			node['child_hi'] = np.searchsorted(next_start, node['end'])
+
+	# DEF: clusters of class QuadTree
+	# Desc: cover all points with clusters as seen from x,y. Single
+	#	points and nodes on the last level are always given as they are.
+	# Parm: x, y - location of the viewer
+	# Parm: theta - accuracy, 0 gives every point, larger is coarser
+	# Return: x, y - float arrays, centre of mass of each cluster
+	#	count - int array, number of points in each cluster
+	def clusters(self, x, y, theta) :
+		cluster_x, cluster_y, cluster_count = [], [], []
+		frontier = np.zeros(1 if self.count else 0, dtype=int)
+		for level in range(len(self.levels)) :
+			if len(frontier) == 0 :
+				break
+			node = self.levels[level]
+			node_x = node['x'][frontier]
+			node_y = node['y'][frontier]
+			count = node['count'][frontier]
+			accept = count == 1
+			if level == self.DEPTH :
+				accept[:] = True
+			else :
+				accept |= node['size'] < theta * np.hypot(node_x - x, node_y - y)
+			cluster_x.append(node_x[accept])
+			cluster_y.append(node_y[accept])
+			cluster_count.append(count[accept])
+			opened = frontier[~accept]
+			if level < self.DEPTH :
+				frontier = expand_ranges(node['child_lo'][opened], node['child_hi'][opened])
+		if len(cluster_x) == 0 :
+			return np.zeros(0), np.zeros(0), np.zeros(0, dtype=int)
+		return np.concatenate(cluster_x), np.concatenate(cluster_y), np.concatenate(cluster_count)
+
+# DEF: spread_bits of module spatial
+# Desc: put the low 16 bits of each value on the even bit positions
+# Parm: value - int64 array
+# Return: int64 array
+# Usage: QuadTree, Morton code
+def spread_bits(value) :
+	value = value & 0xFFFF
+	value = (value | (value << 8)) & 0x00FF00FF
+	value = (value | (value << 4)) & 0x0F0F0F0F
+	value = (value | (value << 2)) & 0x33333333
+	value = (value | (value << 1)) & 0x55555555
+	return value
+
+# DEF: expand_ranges of module spatial
+# Desc: all integers of the ranges lo[i]..hi[i]-1, in order
+# Parm: lo, hi - int arrays
+# Return: int array
+# Usage: QuadTree.clusters
+def expand_ranges(lo, hi) :
+	lengths = hi - lo
+	total = lengths.sum()
+	if total == 0 :
+		return np.zeros(0, dtype=int)
+	offsets = np.cumsum(lengths) - lengths
+	return np.repeat(lo - offsets, lengths) + np.arange(total)
+
+# DEF: rasterize of module spatial
+# Desc: occupancy grid of square boxes, a cell is True when a box
+#	covers part of it
+# Parm: x, y - float arrays, box centres
+# Parm: half_size - half the width of a box
+# Parm: cell - width of a grid cell
+# Return: (grid, x0, y0, cell) - grid is a bool array [column, row],
+#	x0,y0 is the corner of cell [0, 0]. None if there are no boxes.
+# Usage: desertmap.Hills.occupancy
+def rasterize(x, y, half_size, cell) :
+	if len(x) == 0 :
+		return None
+	x0 = x.min() - half_size
+	y0 = y.min() - half_size
+	grid = np.zeros((int((x.max() + half_size - x0) // cell) + 1,
+		int((y.max() + half_size - y0) // cell) + 1), dtype=bool)
+	# first and last cell of each box, then every cell between
+	lo_x = ((x - half_size - x0) // cell).astype(int)
+	lo_y = ((y - half_size - y0) // cell).astype(int)
+	hi_x = np.ceil((x + half_size - x0) / cell).astype(int) - 1
+	hi_y = np.ceil((y + half_size - y0) / cell).astype(int) - 1
+	offset = np.arange(int(2 * half_size // cell) + 2)
+	col = lo_x[:, None] + offset[None, :]
+	row = lo_y[:, None] + offset[None, :]
+	col_ok = col <= hi_x[:, None]
+	row_ok = row <= hi_y[:, None]
+	# every (column, row) pair of each box
+	inside = col_ok[:, :, None] & row_ok[:, None, :]
+	col = np.broadcast_to(col[:, :, None], inside.shape)[inside]
+	row = np.broadcast_to(row[:, None, :], inside.shape)[inside]
+	grid[col, row] = True
+	return grid, x0, y0, cell
+
+# DEF: cast_rays of module spatial
+# Desc: distance along each ray to the first occupied cell, all rays at
+#	once. Grid walk (DDA): each pass moves every ray still going to the
+#	next cell it crosses, across x or across y, whichever comes first.
+#	The passes are bounded by max_range / cell, not by the number of
+#	boxes in the grid.
+# Parm: occupancy - from rasterize, or None for an empty map
+# Parm: x, y - start of the rays, scalars or arrays
+# Parm: angle - array, direction of each ray in radians, y is up
+# Parm: max_range - rays stop at this distance
+# Return: float array, distance to the first hit, max_range for no hit
+# Usage: Sensors.get_sensor_data, lidar
+def cast_rays(occupancy, x, y, angle, max_range) :
+	angle = np.asarray(angle, dtype=float)
+	distance = np.full(angle.shape, float(max_range))
+	if occupancy is None :
+		return distance
+	grid, x0, y0, cell = occupancy
+	dir_x = np.cos(angle)
+	dir_y = np.sin(angle)
+	# start cell and position in cells
+	pos_x = (np.broadcast_to(x, angle.shape) - x0) / cell
+	pos_y = (np.broadcast_to(y, angle.shape) - y0) / cell
+	col = np.floor(pos_x).astype(int)
+	row = np.floor(pos_y).astype(int)
+	step_x = np.where(dir_x >= 0, 1, -1)
+	step_y = np.where(dir_y >= 0, 1, -1)
+	with np.errstate(divide='ignore', invalid='ignore') :
+		# distance along the ray to cross one cell, and to the first edge
+		delta_x = np.abs(cell / dir_x)
+		delta_y = np.abs(cell / dir_y)
+		next_x = np.where(dir_x >= 0, col + 1 - pos_x, pos_x - col) * delta_x
+		next_y = np.where(dir_y >= 0, row + 1 - pos_y, pos_y - row) * delta_y
+	next_x = np.nan_to_num(next_x, nan=np.inf)
+	next_y = np.nan_to_num(next_y, nan=np.inf)
+	travel = np.zeros(angle.shape)
+	going = np.ones(angle.shape, dtype=bool)
+
+	for _ in range(2 * int(max_range // cell) + 3) :
+		on_grid = going & (col >= 0) & (col < grid.shape[0]) & (row >= 0) & (row < grid.shape[1])
+		hit = np.zeros(angle.shape, dtype=bool)
+		hit[on_grid] = grid[col[on_grid], row[on_grid]]
+		distance[hit] = np.minimum(travel[hit], max_range)
+		going &= ~hit
+		# move to the next cell
+		across_x = next_x < next_y
+		travel = np.where(across_x, next_x, next_y)
+		going &= travel <= max_range
+		if not going.any() :
+			break
+		col = np.where(across_x, col + step_x, col)
+		row = np.where(across_x, row, row + step_y)
+		next_x = np.where(across_x, next_x + delta_x, next_x)
+		next_y = np.where(across_x, next_y, next_y + delta_y)
+	return distance
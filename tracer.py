@@ -0,0 +1,185 @@
+# Module: tracer.py
+# Desc: structured trace records for the simulation hot paths.
+#	Each subsystem (nn, map, ...) gets a Channel. A channel has one
+#	flag per level, debug, info and error, that is True only when
+#	that level is enabled for the subsystem. Call sites test the flag
+#	before building a record:
+#		_trace = tracer.channel('nn')
+#		if _trace.debug: _trace.emit('cycle', count=cycle_count)
+#	so a disabled trace costs one attribute test, nothing is formatted.
+#	Enabled records go to a buffered sink, not to the terminal:
+#		ring - the last "size" records are kept in memory, see records()
+#		jsonl - one JSON object per line in "file", written in blocks
+#
+#	Config, all keys optional:
+#	"trace" :
+#		{
+#		"level" : "debug",			off, error, info or debug
+#		"subsystems" : ["nn"],		or "all"
+#		"sink" : "ring",			ring or jsonl
+#		"size" : 4096,				ring size
+#		"file" : "ailab1-trace.jsonl"	jsonl file
+#		}
+#
+# Author: Brad Denniston
+# Version: 0.1, 18 Oct 2026
+
+import atexit
+import collections
+import json
+import time
+import numpy as np
+
+DEBUG = 10
+INFO = 20
+ERROR = 40
+OFF = 100
+LEVELS = {'debug' : DEBUG, 'info' : INFO, 'error' : ERROR, 'off' : OFF}
+
+# CLASS: Channel of module tracer
+# Desc: trace switch and record writer for one subsystem
+# Usage: public, get one with channel()
+class Channel :
+	# DEF: __init__ of class Channel
+	# Parm: name - subsystem name, put in every record
+	def __init__(self, name) :
+		self.name = name
+		self.sink = None
+		self.set_level(OFF)
+
+	# DEF: set_level of class Channel
+	# Desc: set the level flags, a level enables itself and all above it
+	# Parm: level - DEBUG, INFO, ERROR or OFF
+	# Usage: configure
+	def set_level(self, level) :
+		self.level = level
+		self.debug = level <= DEBUG
+		self.info = level <= INFO
+		self.error = level <= ERROR
+
+	# DEF: emit of class Channel
+	# Desc: write one record to the sink. Values are kept as passed, so
+	#	pass a copy of an array that is later changed in place.
+	# Parm: event - name of the record
+	# Parm: fields - values of the record
+	def emit(self, event, **fields) :
+		fields['t'] = time.perf_counter()
+		fields['sub'] = self.name
+		fields['event'] = event
+		self.sink.write(fields)
+
+# CLASS: RingSink of module tracer
+# Desc: keep the last size records in memory
+class RingSink :
+	def __init__(self, size) :
+		self.ring = collections.deque(maxlen=size)
+
+	def write(self, record) :
+		self.ring.append(record)
+
+	def records(self) :
+		return list(self.ring)
+
+	def flush(self) :
+		pass
+
+	def close(self) :
+		pass
+
+# CLASS: JsonlSink of module tracer
+# Desc: write each record as one JSON line to a buffered file
+class JsonlSink :
+	def __init__(self, filename) :
+		self.filename = filename
+		self.file = open(filename, 'w', buffering=1 << 16)
+
+	def write(self, record) :
+		self.file.write(json.dumps(record, default=to_json))
+		self.file.write('\n')
+
+	def records(self) :
+		return list()
+
+	def flush(self) :
+		self.file.flush()
+
+	def close(self) :
+		self.file.close()
+
+# module state, one channel per subsystem and one shared sink
+_channels = dict()
+_sink = RingSink(4096)
+_level = OFF
+_subsystems = 'all'
+
+# DEF: channel of module tracer
+# Desc: get the channel of a subsystem, it is off until configured
+# Parm: name - subsystem name
+# Return: Channel
+# Usage: public, at import of each module that traces
+def channel(name) :
+	if name not in _channels :
+		_channels[name] = Channel(name)
+		set_channel(_channels[name])
+	return _channels[name]
+
+# DEF: configure of module tracer
+# Desc: set the sink and the level of every channel from the config.
+#	A jsonl sink already open on the same file is kept, so each new
+#	Sim appends to the trace instead of truncating it. A sink that is
+#	replaced is closed.
+# Parm: config - dictionary of configuration data, uses "trace"
+# Usage: public, simcore.Sim and SwarmSim
+def configure(config) :
+	global _sink, _level, _subsystems
+	trace_dict = config.get('trace', dict())
+	_level = LEVELS[trace_dict.get('level', 'off')]
+	_subsystems = trace_dict.get('subsystems', 'all')
+
+	if trace_dict.get('sink', 'ring') == 'jsonl' :
+		filename = trace_dict.get('file', 'ailab1-trace.jsonl')
+		if not (isinstance(_sink, JsonlSink) and _sink.filename == filename) :
+			_sink.close()
+			_sink = JsonlSink(filename)
+	else :
+		_sink.close()
+		_sink = RingSink(trace_dict.get('size', 4096))
+
+	for name in _channels :
+		set_channel(_channels[name])
+
+# DEF: set_channel of module tracer
+# Desc: apply the configured sink and level to a channel
+# Usage: local
+def set_channel(trace_channel) :
+	trace_channel.sink = _sink
+	if _subsystems == 'all' or trace_channel.name in _subsystems :
+		trace_channel.set_level(_level)
+	else :
+		trace_channel.set_level(OFF)
+
+# DEF: records of module tracer
+# Return: list of records held by a ring sink, oldest first
+def records() :
+	return _sink.records()
+
+# DEF: flush of module tracer
+# Desc: push buffered records out to the sink file, also at exit
+def flush() :
+	_sink.flush()
+
+atexit.register(flush)
+
+# DEF: to_json of module tracer
+# Desc: JSON form of values json does not know, complex is [real, imag]
+# Usage: JsonlSink.write
+def to_json(value) :
+	if isinstance(value, np.ndarray) :
+		if np.iscomplexobj(value) :
+			return np.stack((value.real, value.imag), axis=-1).tolist()
+		return value.tolist()
+	if isinstance(value, (complex, np.complexfloating)) :
+		return [value.real, value.imag]
+	if isinstance(value, np.generic) :
+		return value.item()
+	return str(value)